@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+'''Adaptive sampling of a function of the incidence height.
+
+    Starting from a coarse uniform grid, every interval is tested at its
+    midpoint: where linear interpolation between the interval's end points
+    misses the function value by more than the tolerance, both halves are
+    tested again in the next round. The midpoint error of linear
+    interpolation grows with the curvature - for eta0 most at the rainbow
+    caustic [its minimum, where the power piles up] and at the rims of the
+    drop. Optionally the error is weighted by the power an interval carries
+    and taken relative to the angle it spans, which keeps the rims [little
+    power, spread over many bins] coarse. All midpoints of one round are
+    evaluated in a single vectorized call, and every evaluated point is
+    kept - together with everything else the same call returned, so the
+    final samples don't need evaluating again.'''
+
+from numpy import abs as absArray, arange, argsort, asarray, atleast_2d, insert, linspace, maximum, nonzero, ones, zeros
+from RayBundle import RayBundle
+
+
+def adaptiveSamples(function, tolerance, start=-1., stop=1., initialNumberOfPoints=65, maximumNumberOfPoints=1000000,
+                    minimumWidth=1e-12, density=None, resolution=None, channels=None):
+    '''Increasing xs and function(xs), refined until the midpoint interpolation error is at most tolerance.
+
+        function       - vectorized, maps an array of xs to an array of ys of shape (N,) or (channels, N)
+        tolerance      - absolute, a scalar or one per channel
+        channels       - optional, the rows of ys the tolerance applies to - the others are only carried along,
+                         e.g. further results of the same evaluation
+        density        - optional, vectorized - the midpoint errors are weighted by density(midpoints, ysMidpoints)
+                         times the interval width, e.g. the power an interval carries, so intervals carrying hardly
+                         any power are not refined
+        resolution     - optional - the midpoint errors are taken relative to the larger of resolution and
+                         the interval's change in y, so intervals spanning many resolution cells [e.g. histogram
+                         bins] only need to be linear relative to that span
+        minimumWidth   - intervals are not split further below this width
+        maximumNumberOfPoints - the refinement stops when it would exceed this number of evaluations; the
+                         intervals with the largest errors are refined first'''
+    xs = linspace(start, stop, initialNumberOfPoints)
+    ys = asarray(function(xs), dtype=float)
+    tolerance = asarray(tolerance, dtype=float).reshape(-1, 1)
+    # intervals to test and the error of the test which created them [their priority when the budget runs out]
+    active = ones(len(xs) - 1, dtype=bool)
+    priorities = zeros(len(xs) - 1)
+    while True:
+        indices = nonzero(active & ((xs[1:] - xs[:-1]) > minimumWidth))[0]
+        budget = maximumNumberOfPoints - len(xs)
+        if len(indices) > budget:
+            indices = indices[argsort(-priorities[indices], kind='stable')[:max(budget, 0)]]
+            indices.sort()
+        if len(indices) == 0:
+            break
+
+        midpoints = (xs[indices] + xs[indices + 1]) / 2.
+        ysMidpoints = asarray(function(midpoints), dtype=float)
+        ysChecked = atleast_2d(ys) if channels is None else atleast_2d(ys)[list(channels)]
+        ysLeft = ysChecked[:, indices]
+        ysRight = ysChecked[:, indices + 1]
+        ysMidpointsChecked = atleast_2d(ysMidpoints) if channels is None else atleast_2d(ysMidpoints)[list(channels)]
+        errors = absArray(ysMidpointsChecked - (ysLeft + ysRight) / 2.)
+        if resolution is not None:
+            errors = errors / maximum(resolution, absArray(ysRight - ysLeft))
+        if density is not None:
+            errors = errors * density(midpoints, ysMidpoints) * (xs[indices + 1] - xs[indices])
+        refine = (errors > tolerance).any(axis=0)
+        errors = (errors / tolerance).max(axis=0)
+
+        xs = insert(xs, indices + 1, midpoints)
+        ys = insert(ys, indices + 1, ysMidpoints, axis=-1)
+        # the halves of split interval j are at indices[j] + j and indices[j] + j + 1 now
+        leftHalves = indices + arange(len(indices))
+        active = zeros(len(xs) - 1, dtype=bool)
+        active[leftHalves] = refine
+        active[leftHalves + 1] = refine
+        priorities = insert(priorities, indices + 1, errors)
+        priorities[leftHalves] = errors
+    return xs, ys
+
+
+def adaptiveHeights(raindropCalculationsFromHeights, tolerance, resolution, powerIncidentDensity,
+                    initialNumberOfPoints=65, maximumNumberOfPoints=1000000):
+    '''Heights in [-1, 1] for the forward redistribution into angle bins of width resolution [radians], and the
+        RayBundle at these heights.
+
+        An interval is refined while the power it would misplace - the power it carries [incident power
+        density times the mean TE/TM transmittance times its width] times the deviation of eta0Internal from
+        linear, relative to the larger of resolution and the interval's angle span - exceeds tolerance. That
+        concentrates the heights at the caustic and wherever eta0 is curved on the scale of a bin, but not at
+        the rims, which carry almost no power. raindropCalculationsFromHeights maps an array of heights to
+        e.g. a RaindropCalculationsBatch, powerIncidentDensity is vectorized. Each round evaluates one batch of
+        rays - eta0Internal and the powers come from the same one, and the rays are kept.'''
+    fieldIndices = {field: index for index, field in enumerate(RayBundle.Fields)}
+
+    def raysData(heights):
+        return RayBundle.fromRaindropCalculations(raindropCalculations=raindropCalculationsFromHeights(heights)).data
+
+    def density(heights, rays):
+        return powerIncidentDensity(heights) * (rays[fieldIndices['powersTE']] + rays[fieldIndices['powersTM']]) / 2.
+    heights, rays = adaptiveSamples(function=raysData, tolerance=tolerance, start=-1., stop=1.,
+                                    initialNumberOfPoints=initialNumberOfPoints,
+                                    maximumNumberOfPoints=maximumNumberOfPoints, density=density,
+                                    resolution=resolution, channels=(fieldIndices['eta0Internal'],))
+    return heights, RayBundle(data=rays)
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+
+'''Class for storing many angles in one numpy array.
+
+    The counterpart of Angle for whole sweeps - arithmetic and comparisons
+    are vectorized instead of creating one Angle per element. Missing
+    angles [None] are stored as NaN; they propagate through arithmetic and
+    compare as False, mask tells them apart.'''
+
+from numpy import array, asarray, isnan
+
+from Angle import Angle
+from TypeHelpers import TypeChecker
+
+
+class AngleArray(TypeChecker):
+
+    def __init__(self, degrees=None, radians=None, turns=None):
+        TypeChecker.__init__(self)
+        arguments = (degrees, radians, turns)
+        # count() would compare arrays elementwise
+        numberOfNonNoneArguments = sum(argument is not None for argument in arguments)
+        if numberOfNonNoneArguments != 1:
+            raise ValueError('Expected exactly one non-None argument, got {numberOfNonNoneArguments}.'.format(numberOfNonNoneArguments=numberOfNonNoneArguments))
+
+        if degrees is not None:
+            self.degrees = degrees
+        elif radians is not None:
+            self.radians = radians
+        elif turns is not None:
+            self.turns = turns
+        return
+
+    @staticmethod
+    def _toArray(values):
+        # None elements become NaN
+        return array(values, dtype=float)
+
+    @classmethod
+    def fromAngles(cls, angles):
+        return cls(radians=tuple((None if angle is None else angle.radians) for angle in angles))
+
+    def toAngles(self):
+        return tuple(self)
+
+    @property
+    def degrees(self):
+        return Angle.radiansToDegrees(self._values)
+
+    @degrees.setter
+    def degrees(self, values):
+        self._values = Angle.degreesToRadians(self._toArray(values))
+        return
+
+    @property
+    def radians(self):
+        '''The underlying array - no copy.'''
+        return self._values
+
+    @radians.setter
+    def radians(self, values):
+        self._values = self._toArray(values)
+        return
+
+    @property
+    def turns(self):
+        return Angle.radiansToTurns(self._values)
+
+    @turns.setter
+    def turns(self, values):
+        self._values = Angle.turnsToRadians(self._toArray(values))
+        return
+
+    @property
+    def mask(self):
+        '''True where the angle is missing.'''
+        return isnan(self._values)
+
+    @property
+    def shape(self):
+        return self._values.shape
+
+    def __len__(self):
+        return len(self._values)
+
+    def __getitem__(self, key):
+        values = self._values[key]
+        if values.ndim == 0:
+            return None if isnan(values) else Angle(radians=float(values))
+        return AngleArray(radians=values)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+        return
+
+    def __str__(self):
+        return '{degrees}°'.format(degrees=self.degrees)
+
+    def __repr__(self):
+        return '{value} - AngleArray at {address}'.format(value=str(self), address = hex(id(self)))
+
+    @staticmethod
+    def _radiansOf(other, exceptionMessage):
+        # Angles broadcast against AngleArrays, a None Angle counts as missing
+        TypeChecker.checkType(expectedType=(AngleArray, Angle), value=other, exceptionMessage=exceptionMessage)
+        return float('nan') if other.radians is None else other.radians
+
+    def __add__(self, other):
+        return AngleArray(radians=(self._values + self._radiansOf(other, exceptionMessage='Only Angles can be added to AngleArrays')))
+
+    def __sub__(self, other):
+        return AngleArray(radians=(self._values - self._radiansOf(other, exceptionMessage='Only Angles can be subtracted from AngleArrays')))
+
+    def __neg__(self):
+        return AngleArray(radians=-self._values)
+
+    def __mul__(self, other):
+        if isinstance(other, (AngleArray, Angle)):
+            raise TypeError('Incompatible type supplied [{type}]: AngleArrays can only be multiplied by numbers.'.format(type=type(other)))
+        return AngleArray(radians=(self._values * asarray(other, dtype=float)))
+
+    def __rmul__(self, other):
+        return self * other
+
+    def __truediv__(self, other):
+        if isinstance(other, (AngleArray, Angle)):
+            raise TypeError('Incompatible type supplied [{type}]: AngleArrays can only be divided by numbers.'.format(type=type(other)))
+        return self * (1. / asarray(other, dtype=float))
+
+    def _compareValues(self, other):
+        return self._radiansOf(other, exceptionMessage='AngleArrays can only be compared to Angles')
+
+    def __gt__(self, other):
+        return self._values > self._compareValues(other)
+
+    def __lt__(self, other):
+        return self._values < self._compareValues(other)
+
+    def __ge__(self, other):
+        return self._values >= self._compareValues(other)
+
+    def __le__(self, other):
+        return self._values <= self._compareValues(other)
+
+    def __ne__(self, other):
+        # missing angles are neither equal nor unequal
+        values = self._compareValues(other)
+        return (self._values != values) & ~self.mask & ~isnan(values)
+
+    def __eq__(self, other):
+        return self._values == self._compareValues(other)
+
+    # comparisons return arrays, so AngleArrays can't be hashed
+    __hash__ = None
+    # numpy arrays and scalars defer to the reflected operators above
+    __array_ufunc__ = None
+
+
+
+if __name__ == '__main__':
+    angles = AngleArray(degrees=(0., 90., None, 270.))
+    print(angles, angles.mask)
+    print((angles + Angle(degrees=45)).degrees, (angles * 2).turns, angles > Angle(degrees=45))
+    print(angles[1], angles[2], angles[1:].degrees, AngleArray.fromAngles(angles.toAngles()).degrees)
+    exit(0)
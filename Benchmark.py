@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+
+'''Benchmarks of the per-wavelength pipeline and its hot kernels.
+
+    Every benchmark is set up once per (numberOfPoints, supersampling) pair
+    and timed with timeit - the best time per call over several repeats is
+    reported. Results are written as JSON so that runs can be compared, e.g.
+
+        python Benchmark.py --output before.json
+        python Benchmark.py --compare before.json
+
+    fails [exit code 1] if any benchmark got slower than the threshold.'''
+
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+from json import dump, load
+from platform import machine, platform, python_version
+from statistics import median
+from os.path import abspath, dirname
+from subprocess import DEVNULL, CalledProcessError, check_output
+from sys import stderr, stdout
+from timeit import Timer
+import numpy
+from Angle import Angle
+from FresnelCoefficients import FresnelCoefficients, Medium
+from Length import Length
+from LinearInterpolation import StepwiseLinearFunctionInterpolator
+from RaindropCalculations import RaindropCalculations
+from RaindropCalculationsBatch import RaindropCalculationsBatch
+from RefractiveIndex import _sellmeierPermittivity, RefractiveIndex2007DaimonMasumura20CWater as RefractiveIndexWater
+from WavelengthSweep import calculateWavelength, transformSurjectiveRelation
+from numpy import linspace
+
+
+RefractiveIndexInner = 1.3347
+RefractiveIndexOuter = 1.
+
+
+def _heights(numberOfPoints, supersampling):
+    # the supersampled heights of one wavelength iteration
+    return linspace(-1, 1, numberOfPoints * supersampling)
+
+def _wavelengths(numberOfPoints, supersampling):
+    return tuple(Length(nanometers=value) for value in linspace(380, 740, numberOfPoints * supersampling))
+
+
+def benchmarkRaindropCalculations(numberOfPoints, supersampling):
+    heights = _heights(numberOfPoints=numberOfPoints, supersampling=supersampling)
+    def run():
+        for height in heights:
+            calculation = RaindropCalculations(refractiveIndexOuter=RefractiveIndexOuter,
+                                               refractiveIndexInner=RefractiveIndexInner,
+                                               incidenceHeight=height)
+            calculation.eta0Internal
+            calculation.transmittedPowerTransversalElectric
+            calculation.transmittedPowerTransversalMagnetic
+        return
+    return run
+
+def benchmarkRaindropCalculationsBatch(numberOfPoints, supersampling):
+    heights = _heights(numberOfPoints=numberOfPoints, supersampling=supersampling)
+    def run():
+        calculation = RaindropCalculationsBatch(refractiveIndexOuter=RefractiveIndexOuter,
+                                                refractiveIndexInner=RefractiveIndexInner,
+                                                incidenceHeights=heights)
+        calculation.eta0Internal
+        calculation.transmittedPowerTransversalElectric
+        calculation.transmittedPowerTransversalMagnetic
+        return
+    return run
+
+def _fresnelCoefficients():
+    return FresnelCoefficients(mediumFrom=Medium(refractiveIndex=RefractiveIndexOuter, magneticPermeability=1.),
+                               mediumTo=Medium(refractiveIndex=RefractiveIndexInner, magneticPermeability=1.))
+
+def benchmarkFresnelCoefficients(numberOfPoints, supersampling):
+    fresnel = _fresnelCoefficients()
+    angles = tuple(Angle(radians=value) for value in numpy.arcsin(_heights(numberOfPoints=numberOfPoints, supersampling=supersampling)))
+    def run():
+        for angle in angles:
+            fresnel.transmittanceTransversalElectric(incidenceAngle=angle)
+            fresnel.reflectanceTransversalElectric(incidenceAngle=angle)
+            fresnel.transmittanceTransversalMagnetic(incidenceAngle=angle)
+            fresnel.reflectanceTransversalMagnetic(incidenceAngle=angle)
+        return
+    return run
+
+def benchmarkFresnelCoefficientsArray(numberOfPoints, supersampling):
+    fresnel = _fresnelCoefficients()
+    angles = numpy.arcsin(_heights(numberOfPoints=numberOfPoints, supersampling=supersampling))
+    def run():
+        fresnel.transmittanceTransversalElectricArray(incidenceAngles=angles)
+        fresnel.reflectanceTransversalElectricArray(incidenceAngles=angles)
+        fresnel.transmittanceTransversalMagneticArray(incidenceAngles=angles)
+        fresnel.reflectanceTransversalMagneticArray(incidenceAngles=angles)
+        return
+    return run
+
+def _eta0sInternal(heights):
+    return RaindropCalculationsBatch(refractiveIndexOuter=RefractiveIndexOuter, refractiveIndexInner=RefractiveIndexInner,
+                                     incidenceHeights=heights).eta0Internal
+
+def benchmarkInterpolatorAt(numberOfPoints, supersampling):
+    heights = linspace(-1, 1, numberOfPoints)
+    interpolator = StepwiseLinearFunctionInterpolator.fromArrays(xValues=heights, yValues=_eta0sInternal(heights=heights))
+    xs = _heights(numberOfPoints=numberOfPoints, supersampling=supersampling)
+    def run():
+        for x in xs:
+            interpolator.at(x)
+        return
+    return run
+
+def benchmarkInterpolatorWhere(numberOfPoints, supersampling):
+    heights = linspace(-1, 1, numberOfPoints)
+    eta0sInternal = _eta0sInternal(heights=heights)
+    interpolator = StepwiseLinearFunctionInterpolator.fromArrays(xValues=heights, yValues=eta0sInternal)
+    ys = linspace(min(eta0sInternal), max(eta0sInternal), numberOfPoints * supersampling)
+    def run():
+        for y in ys:
+            interpolator.where(y, index=1)
+        return
+    return run
+
+def benchmarkTransformSurjectiveRelation(numberOfPoints, supersampling):
+    heights = linspace(-1, 1, numberOfPoints * supersampling)
+    calculation = RaindropCalculationsBatch(refractiveIndexOuter=RefractiveIndexOuter,
+                                            refractiveIndexInner=RefractiveIndexInner,
+                                            incidenceHeights=heights)
+    eta0sInternal = calculation.eta0Internal
+    powers = (calculation.transmittedPowerTransversalElectric, calculation.transmittedPowerTransversalMagnetic)
+    def run():
+        transformSurjectiveRelation(oldXs=heights, newXsOldXs=eta0sInternal, oldYsOldXsList=powers,
+                                    numberOfPoints=numberOfPoints, newXValidityCheck=lambda x: (-1. <= x <= 1.))
+        return
+    return run
+
+def benchmarkSellmeierPermittivity(numberOfPoints, supersampling):
+    refractiveIndex = RefractiveIndexWater()
+    wavelengths = _wavelengths(numberOfPoints=numberOfPoints, supersampling=supersampling)
+    def run():
+        # time the calculation, not the cache
+        _sellmeierPermittivity.cache_clear()
+        for wavelength in wavelengths:
+            refractiveIndex.permittivity(wavelength=wavelength)
+        return
+    return run
+
+def benchmarkSellmeierPermittivityArray(numberOfPoints, supersampling):
+    refractiveIndex = RefractiveIndexWater()
+    wavelengthsMeters = tuple(wavelength.meters for wavelength in _wavelengths(numberOfPoints=numberOfPoints, supersampling=supersampling))
+    def run():
+        refractiveIndex.permittivityArray(wavelengthsMeters=wavelengthsMeters)
+        return
+    return run
+
+def _benchmarkWavelength(redistribution):
+    def benchmark(numberOfPoints, supersampling):
+        wavelength = Length(nanometers=560)
+        def run():
+            calculateWavelength(wavelength=wavelength, numberOfPoints=numberOfPoints, supersampling=supersampling,
+                                redistribution=redistribution)
+            return
+        return run
+    return benchmark
+
+
+# name -> function(numberOfPoints, supersampling) returning the callable to time
+Benchmarks = {
+    'RaindropCalculations': benchmarkRaindropCalculations,
+    'RaindropCalculationsBatch': benchmarkRaindropCalculationsBatch,
+    'FresnelCoefficients': benchmarkFresnelCoefficients,
+    'FresnelCoefficientsArray': benchmarkFresnelCoefficientsArray,
+    'StepwiseLinearFunctionInterpolator.at': benchmarkInterpolatorAt,
+    'StepwiseLinearFunctionInterpolator.where': benchmarkInterpolatorWhere,
+    'transformSurjectiveRelation': benchmarkTransformSurjectiveRelation,
+    'RefractiveIndexSellmeier.permittivity': benchmarkSellmeierPermittivity,
+    'RefractiveIndexSellmeier.permittivityArray': benchmarkSellmeierPermittivityArray,
+    'calculateWavelength.histogram': _benchmarkWavelength(redistribution='histogram'),
+    'calculateWavelength.surjective': _benchmarkWavelength(redistribution='surjective'),
+}
+
+
+def timeBenchmark(run, repeat):
+    '''Seconds per call - best and median over repeat runs of timeit's automatically chosen number of calls.'''
+    timer = Timer(run)
+    number, _ = timer.autorange()
+    times = tuple(time / number for time in timer.repeat(repeat=repeat, number=number))
+    return {'number': number, 'repeat': repeat, 'best': min(times), 'median': median(times)}
+
+def runBenchmarks(names, numbersOfPoints, supersamplings, repeat, log=None):
+    results = list()
+    for name in names:
+        for numberOfPoints in numbersOfPoints:
+            for supersampling in supersamplings:
+                run = Benchmarks[name](numberOfPoints=numberOfPoints, supersampling=supersampling)
+                result = dict(benchmark=name, numberOfPoints=numberOfPoints, supersampling=supersampling)
+                result.update(timeBenchmark(run=run, repeat=repeat))
+                results.append(result)
+                if log is not None:
+                    print('{benchmark:45} N={numberOfPoints:<6} s={supersampling:<3} {best:.6f}s'.format(**result), file=log)
+    return results
+
+def _gitRevision():
+    # of the repository of this file, wherever the benchmark is run from
+    try:
+        return check_output(('git', 'rev-parse', 'HEAD'), cwd=dirname(abspath(__file__)), stderr=DEVNULL,
+                            text=True).strip()
+    except (CalledProcessError, OSError):
+        return None
+
+def metadata():
+    return {'timestamp': datetime.now(timezone.utc).isoformat(),
+            'revision': _gitRevision(),
+            'python': python_version(),
+            'numpy': numpy.__version__,
+            'platform': platform(),
+            'machine': machine()}
+
+def _resultKey(result):
+    return (result['benchmark'], result['numberOfPoints'], result['supersampling'])
+
+def compareResults(baseline, current, threshold):
+    '''(key, ratio current / baseline, regressed) for every benchmark present in both runs - best times are compared.'''
+    baselineByKey = {_resultKey(result): result for result in baseline['results']}
+    comparison = list()
+    for result in current['results']:
+        key = _resultKey(result)
+        if key in baselineByKey:
+            ratio = result['best'] / baselineByKey[key]['best']
+            comparison.append((key, ratio, ratio > threshold))
+    return comparison
+
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Benchmark the rainbow calculation kernels.')
+    parser.add_argument('--points', type=int, nargs='+', default=(201, 1001), help='values of numberOfPoints')
+    parser.add_argument('--supersampling', type=int, nargs='+', default=(2, 5), help='values of supersampling')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--filter', default='', help='only run benchmarks whose name contains this')
+    parser.add_argument('--output', default=None, help='JSON result file [default: stdout]')
+    parser.add_argument('--compare', default=None, help='JSON result file of an earlier run')
+    parser.add_argument('--threshold', type=float, default=1.2, help='slowdown ratio reported as regression')
+    arguments = parser.parse_args()
+
+    names = tuple(name for name in Benchmarks if arguments.filter in name)
+    # progress goes to stderr when the results go to stdout
+    log = stdout if arguments.output is not None else stderr
+    current = {'metadata': metadata(),
+               'results': runBenchmarks(names=names, numbersOfPoints=arguments.points,
+                                        supersamplings=arguments.supersampling, repeat=arguments.repeat, log=log)}
+
+    if arguments.output is None:
+        dump(current, stdout, indent=2)
+        print('')
+    else:
+        with open(arguments.output, 'w') as file:
+            dump(current, file, indent=2)
+
+    regressed = False
+    if arguments.compare is not None:
+        with open(arguments.compare) as file:
+            baseline = load(file)
+        for (name, numberOfPoints, supersampling), ratio, slower in compareResults(baseline=baseline, current=current,
+                                                                                  threshold=arguments.threshold):
+            print('{name:45} N={numberOfPoints:<6} s={supersampling:<3} {ratio:6.2f}x{flag}'.format(
+                name=name, numberOfPoints=numberOfPoints, supersampling=supersampling, ratio=ratio,
+                flag='  REGRESSION' if slower else ''), file=log)
+            regressed = regressed or slower
+    exit(1 if regressed else 0)
@@ -1,5 +1,7 @@
 
 from math import asin, cos, isclose, sin, sqrt
+from numpy import arcsin as asinArray, asarray, cos as cosArray, inf, minimum, nan, \
+                  sin as sinArray, sqrt as sqrtArray, where
 from Angle import Angle
 
 class Medium(object):
@@ -179,33 +181,112 @@ class FresnelCoefficients(object):
         return self.amplitudeToPowerReflectance(reflectance=self.reflectanceTransversalMagneticAmplitude(incidenceAngle=incidenceAngle))
 
 
+    # array versions - incidence angles are given as arrays of radians instead of Angles, the refractive indices
+    # and magnetic permeabilities of the media may be arrays as well [e.g. one per wavelength] and are broadcast
+
+    def _getTotalInternalReflexionThresholdAngleArray(self):
+        nFrom = asarray(self.mediumFrom.refractiveIndex, dtype=float)
+        nTo = asarray(self.mediumTo.refractiveIndex, dtype=float)
+        return where(nFrom > nTo, asinArray(minimum(nTo / nFrom, 1.)), inf)
+
+    def _getTotalInternalReflexionMaskArray(self, incidenceAngles):
+        return abs(incidenceAngles) > self._getTotalInternalReflexionThresholdAngleArray()
+
+    def _getTransmittedRootArray(self, incidenceAngles, totalInternalReflexion):
+        # sqrt(er1 - er0 * sin(alpha)^2), set to 0 where total internal reflexion occurs
+        er0 = asarray(self.mediumFrom.refractiveIndex, dtype=float) ** 2
+        er1 = asarray(self.mediumTo.refractiveIndex, dtype=float) ** 2
+        tmp = er1 - er0 * (sinArray(incidenceAngles) ** 2)
+        # slightly negative from rounding [|tmp| <= 1e-12, as isclose with rtol=0 - but without its overhead]
+        tmp = where(totalInternalReflexion | ((tmp < 0) & (tmp >= -1e-12)), 0., tmp)
+        return sqrtArray(tmp)
+
+    def getTransmissionAngleArray(self, incidenceAngles):
+        sinBeta = self.mediumFrom.refractiveIndex / self.mediumTo.refractiveIndex * sinArray(asarray(incidenceAngles, dtype=float))
+        valid = abs(sinBeta) <= 1
+        return where(valid, asinArray(where(valid, sinBeta, 0.)), nan)
+
+    def amplitudeToPowerTransmittanceArray(self, incidenceAngles, transmittance):
+        incidenceAngles = asarray(incidenceAngles, dtype=float)
+        totalInternalReflexion = self._getTotalInternalReflexionMaskArray(incidenceAngles)
+        n0 = asarray(self.mediumFrom.refractiveIndex, dtype=float)
+        root = self._getTransmittedRootArray(incidenceAngles, totalInternalReflexion)
+        powerRatio = (root / (n0 * cosArray(incidenceAngles))) * (abs(transmittance) ** 2)
+        return where(totalInternalReflexion, 0., powerRatio)
+
+    def amplitudeToPowerReflectanceArray(self, reflectance):
+        return abs(asarray(reflectance)) ** 2
+
+    def transmittanceTransversalElectricAmplitudeArray(self, incidenceAngles):
+        incidenceAngles = asarray(incidenceAngles, dtype=float)
+        totalInternalReflexion = self._getTotalInternalReflexionMaskArray(incidenceAngles)
+        n0 = asarray(self.mediumFrom.refractiveIndex, dtype=float)
+        ur0 = asarray(self.mediumFrom.magneticPermeability, dtype=float)
+        ur1 = asarray(self.mediumTo.magneticPermeability, dtype=float)
+        a = n0 * cosArray(incidenceAngles)
+        b = ur0 / ur1 * self._getTransmittedRootArray(incidenceAngles, totalInternalReflexion)
+        return where(totalInternalReflexion, 0., 2. * a / (a + b))
+
+    def transmittanceTransversalElectricArray(self, incidenceAngles):
+        return self.amplitudeToPowerTransmittanceArray(incidenceAngles=incidenceAngles,
+                                                       transmittance=self.transmittanceTransversalElectricAmplitudeArray(incidenceAngles=incidenceAngles))
+
+    def reflectanceTransversalElectricAmplitudeArray(self, incidenceAngles):
+        incidenceAngles = asarray(incidenceAngles, dtype=float)
+        totalInternalReflexion = self._getTotalInternalReflexionMaskArray(incidenceAngles)
+        n0 = asarray(self.mediumFrom.refractiveIndex, dtype=float)
+        ur0 = asarray(self.mediumFrom.magneticPermeability, dtype=float)
+        ur1 = asarray(self.mediumTo.magneticPermeability, dtype=float)
+        a = n0 * cosArray(incidenceAngles)
+        b = ur0 / ur1 * self._getTransmittedRootArray(incidenceAngles, totalInternalReflexion)
+        return where(totalInternalReflexion, 1., (a - b) / (a + b))
+
+    def reflectanceTransversalElectricArray(self, incidenceAngles):
+        return self.amplitudeToPowerReflectanceArray(reflectance=self.reflectanceTransversalElectricAmplitudeArray(incidenceAngles=incidenceAngles))
+
+    def transmittanceTransversalMagneticAmplitudeArray(self, incidenceAngles):
+        incidenceAngles = asarray(incidenceAngles, dtype=float)
+        totalInternalReflexion = self._getTotalInternalReflexionMaskArray(incidenceAngles)
+        n0 = asarray(self.mediumFrom.refractiveIndex, dtype=float)
+        n1 = asarray(self.mediumTo.refractiveIndex, dtype=float)
+        ur0 = asarray(self.mediumFrom.magneticPermeability, dtype=float)
+        ur1 = asarray(self.mediumTo.magneticPermeability, dtype=float)
+        cosAlpha = cosArray(incidenceAngles)
+        a = n1 ** 2 * ur0 / ur1 * cosAlpha
+        b = n0 * self._getTransmittedRootArray(incidenceAngles, totalInternalReflexion)
+        return where(totalInternalReflexion, 0., 2. * n0 * n1 * cosAlpha / (a + b))
+
+    def transmittanceTransversalMagneticArray(self, incidenceAngles):
+        return self.amplitudeToPowerTransmittanceArray(incidenceAngles=incidenceAngles,
+                                                       transmittance=self.transmittanceTransversalMagneticAmplitudeArray(incidenceAngles=incidenceAngles))
+
+    def reflectanceTransversalMagneticAmplitudeArray(self, incidenceAngles):
+        incidenceAngles = asarray(incidenceAngles, dtype=float)
+        totalInternalReflexion = self._getTotalInternalReflexionMaskArray(incidenceAngles)
+        n0 = asarray(self.mediumFrom.refractiveIndex, dtype=float)
+        n1 = asarray(self.mediumTo.refractiveIndex, dtype=float)
+        ur0 = asarray(self.mediumFrom.magneticPermeability, dtype=float)
+        ur1 = asarray(self.mediumTo.magneticPermeability, dtype=float)
+        a = n1 ** 2 * ur0 / ur1 * cosArray(incidenceAngles)
+        b = n0 * self._getTransmittedRootArray(incidenceAngles, totalInternalReflexion)
+        return where(totalInternalReflexion, 1., (a - b) / (a + b))
+
+    def reflectanceTransversalMagneticArray(self, incidenceAngles):
+        return self.amplitudeToPowerReflectanceArray(reflectance=self.reflectanceTransversalMagneticAmplitudeArray(incidenceAngles=incidenceAngles))
+
+
+
 
 if __name__ == '__main__':
-    from matplotlib import pyplot as plt
-    from numpy import linspace
-    angles = tuple(Angle(degrees=value) for value in linspace(start=0., stop=90, num=150))
+    # plotted over all incidence angles by RainbowFigures.plotFresnelCoefficients
     fresnel = FresnelCoefficients(mediumFrom=Medium(refractiveIndex=1.5, magneticPermeability=1), mediumTo=Medium(refractiveIndex=1., magneticPermeability=1))
-    # amplitude
-    TEtransmittanceAmplitude = tuple(fresnel.transmittanceTransversalElectricAmplitude(incidenceAngle=angle) for angle in angles)
-    TEreflectanceAmplitude = tuple(fresnel.reflectanceTransversalElectricAmplitude(incidenceAngle=angle) for angle in angles)
-    TMtransmittanceAmplitude = tuple(fresnel.transmittanceTransversalMagneticAmplitude(incidenceAngle=angle) for angle in angles)
-    TMreflectanceAmplitude = tuple(fresnel.reflectanceTransversalMagneticAmplitude(incidenceAngle=angle) for angle in angles)
-    # power
-    TEtransmittance = tuple(fresnel.transmittanceTransversalElectric(incidenceAngle=angle) for angle in angles)
-    TEreflectance = tuple(fresnel.reflectanceTransversalElectric(incidenceAngle=angle) for angle in angles)
-    TMtransmittance = tuple(fresnel.transmittanceTransversalMagnetic(incidenceAngle=angle) for angle in angles)
-    TMreflectance = tuple(fresnel.reflectanceTransversalMagnetic(incidenceAngle=angle) for angle in angles)
-    # plotting
-    anglesDegrees = tuple(angle.degrees for angle in angles)
-    subplot0 = plt.subplot(1,2,1)
-    subplot0.plot(anglesDegrees, TEtransmittance)
-    subplot0.plot(anglesDegrees, TEreflectance)
-    subplot0.plot(anglesDegrees, TMtransmittance)
-    subplot0.plot(anglesDegrees, TMreflectance)
-    subplot1 = plt.subplot(1,2,2)
-    subplot1.plot(anglesDegrees, TEtransmittanceAmplitude)
-    subplot1.plot(anglesDegrees, TEreflectanceAmplitude)
-    subplot1.plot(anglesDegrees, TMtransmittanceAmplitude)
-    subplot1.plot(anglesDegrees, TMreflectanceAmplitude)
-    plt.show()
+    print('angle [°]     TE-t     TE-r     TM-t     TM-r')
+    for degrees in (0., 20., 40., 41.8, 60., 90.):
+        angle = Angle(degrees=degrees)
+        print('{angle:9.1f} {TEt:8.4f} {TEr:8.4f} {TMt:8.4f} {TMr:8.4f}'.format(
+            angle=degrees,
+            TEt=fresnel.transmittanceTransversalElectric(incidenceAngle=angle),
+            TEr=fresnel.reflectanceTransversalElectric(incidenceAngle=angle),
+            TMt=fresnel.transmittanceTransversalMagnetic(incidenceAngle=angle),
+            TMr=fresnel.reflectanceTransversalMagnetic(incidenceAngle=angle)))
     exit(0)
@@ -1,3 +1,4 @@
+from numpy import asarray, clip, concatenate, cumsum, diff, exp, linspace, loadtxt, sqrt, where
 
 
 def powerIncidentDensityProfile(height, ):
@@ -9,28 +10,135 @@ def powerIncidentDensityProfile(height, ):
     return powerDensity
 
 
+class IncidentPowerProfile(object):
+    '''Incident power density over the normalized height, piecewise linear between nodes and 0 outside of them.
+
+        The cumulative power at the nodes is calculated once, so that the cumulative power at any height, the
+        power within intervals [e.g. bins] and inverse transform sampling are exact for the piecewise linear
+        density - no numerical quadrature per query.'''
+
+    def __init__(self, heights, powerDensities):
+        heights = asarray(heights, dtype=float)
+        powerDensities = asarray(powerDensities, dtype=float)
+        if (heights.ndim != 1) or (heights.shape != powerDensities.shape) or (len(heights) < 2):
+            raise ValueError('Expected at least two heights and one power density per height.')
+        if (diff(heights) <= 0).any():
+            raise ValueError('The heights must be strictly increasing.')
+        if (powerDensities < 0).any():
+            raise ValueError('Power densities must not be negative.')
+        self._heights = heights
+        self._powerDensities = powerDensities
+        self._slopes = diff(powerDensities) / diff(heights)
+        self._cumulativePowers = concatenate(((0.,), cumsum(diff(heights) * (powerDensities[1:] + powerDensities[:-1]) / 2.)))
+        return
+
+    @property
+    def heights(self):
+        return self._heights
+
+    @property
+    def powerDensities(self):
+        return self._powerDensities
+
+    @property
+    def totalPower(self):
+        return float(self._cumulativePowers[-1])
+
+    def _segments(self, heights):
+        # segment index and offset within the segment for each height, clipped to the nodes
+        heights = clip(asarray(heights, dtype=float), self._heights[0], self._heights[-1])
+        indices = clip(self._heights.searchsorted(heights, side='right') - 1, 0, len(self._heights) - 2)
+        return indices, heights - self._heights[indices]
+
+    def powerDensityArray(self, heights):
+        heights = asarray(heights, dtype=float)
+        indices, offsets = self._segments(heights)
+        powerDensities = self._powerDensities[indices] + self._slopes[indices] * offsets
+        return where((heights >= self._heights[0]) & (heights <= self._heights[-1]), powerDensities, 0.)
+
+    def powerDensity(self, height):
+        return float(self.powerDensityArray(height))
+
+    def cumulativePowerArray(self, heights):
+        '''Power incident below each height.'''
+        indices, offsets = self._segments(heights)
+        return self._cumulativePowers[indices] + self._powerDensities[indices] * offsets + self._slopes[indices] / 2. * offsets ** 2
+
+    def powerInIntervals(self, edges):
+        '''Power incident between consecutive edges, e.g. of height bins.'''
+        return diff(self.cumulativePowerArray(edges))
+
+    def heightsFromCumulativePowers(self, cumulativePowers):
+        '''Inverse of cumulativePowerArray - the heights below which the given powers are incident.'''
+        cumulativePowers = clip(asarray(cumulativePowers, dtype=float), 0., self.totalPower)
+        indices = clip(self._cumulativePowers.searchsorted(cumulativePowers, side='right') - 1, 0, len(self._heights) - 2)
+        remainders = cumulativePowers - self._cumulativePowers[indices]
+        powerDensities = self._powerDensities[indices]
+        slopes = self._slopes[indices]
+        # solve slope / 2 * t^2 + powerDensity * t = remainder for the offset t within the segment
+        # [in the cancellation free form, which also covers slope = 0]
+        discriminants = sqrt((powerDensities ** 2 + 2 * slopes * remainders).clip(min=0.))
+        denominators = powerDensities + discriminants
+        offsets = where(denominators > 0, 2 * remainders / where(denominators > 0, denominators, 1.), 0.)
+        return clip(self._heights[indices] + offsets, self._heights[indices], self._heights[indices + 1])
+
+    def sampleHeights(self, generator, size):
+        '''size heights distributed like the power density [inverse transform sampling], generator is a
+            numpy.random.Generator.'''
+        return self.heightsFromCumulativePowers(generator.uniform(0., self.totalPower, size=size))
+
+
+class UniformIncidentPowerProfile(IncidentPowerProfile):
+    '''Constant power density on [-1, 1] - the default, equal to powerIncidentDensityProfile.'''
+
+    def __init__(self, powerDensity=.5):
+        IncidentPowerProfile.__init__(self, heights=(-1., 1.), powerDensities=(powerDensity, powerDensity))
+        return
+
+
+class GaussianIncidentPowerProfile(IncidentPowerProfile):
+    '''Gaussian beam of the given width [standard deviation] around center, cut to [-1, 1] and scaled to
+        totalPower there. Tabulated on numberOfNodes heights.'''
+
+    def __init__(self, width, center=0., totalPower=1., numberOfNodes=4097):
+        heights = linspace(-1., 1., numberOfNodes)
+        powerDensities = exp(-.5 * ((heights - center) / width) ** 2)
+        # normalized with the trapezoid sum, which is the exact integral of the piecewise linear density
+        unscaledTotalPower = (diff(heights) * (powerDensities[1:] + powerDensities[:-1]) / 2.).sum()
+        IncidentPowerProfile.__init__(self, heights=heights, powerDensities=powerDensities * totalPower / unscaledTotalPower)
+        return
+
+
+class TabulatedIncidentPowerProfile(IncidentPowerProfile):
+    '''Power densities given at heights, e.g. a measured beam profile.'''
+
+    @classmethod
+    def fromFile(cls, fileName, delimiter=None, skipRows=0):
+        '''Two columns - height and power density.'''
+        table = loadtxt(fileName, delimiter=delimiter, skiprows=skipRows, ndmin=2)
+        return cls(heights=table[:, 0], powerDensities=table[:, 1])
 
 
 
 if __name__ == '__main__':
-    from matplotlib import pyplot
-    from numpy import fromiter, linspace, diff, multiply, sum
+    from numpy import fromiter, histogram
+    from numpy.random import default_rng
 
+    # plotted by RainbowFigures.plotIncidentPowerProfiles
     heights = linspace(-2., 2., 101)
     powerDensity = fromiter((powerIncidentDensityProfile(height) for height in heights),
                             dtype='float')
 
     averagedPowerDensity = (powerDensity[1:] + powerDensity[:-1]) / 2.
-    tmp0 = diff(heights)
-    tmp2 = multiply(tmp0, averagedPowerDensity)
-
-    totalPower = sum(multiply(diff(heights), averagedPowerDensity))
+    totalPower = (diff(heights) * averagedPowerDensity).sum()
     print('Total power: {power}'.format(power=totalPower))
 
-    pyplot.plot(heights, powerDensity, '-o')
-    pyplot.show()
+    edges = linspace(-1., 1., 21)
+    for profile in (UniformIncidentPowerProfile(), GaussianIncidentPowerProfile(width=.3)):
+        samples = profile.sampleHeights(generator=default_rng(0), size=1000000)
+        expected = profile.powerInIntervals(edges=edges) / profile.totalPower
+        observed = histogram(samples, bins=edges)[0] / len(samples)
+        print('{profile}: total power {power}, largest deviation of the sampled fractions per bin {deviation:.1e}'.format(
+            profile=type(profile).__name__, power=profile.totalPower, deviation=abs(observed - expected).max()))
 
     exit(0)
-
-
-
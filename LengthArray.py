@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+
+'''Class for storing many lengths in one numpy array.
+
+    The counterpart of Length for e.g. wavelength grids - arithmetic and
+    comparisons are vectorized instead of creating one Length per element.
+    Missing lengths [None] are stored as NaN, which replaces the NoneHelpers
+    semantics: they propagate through arithmetic and compare as False, mask
+    tells them apart.'''
+
+from numpy import array, asarray, isnan
+
+from TypeHelpers import TypeChecker
+from Length import Length
+from MetricPrefixes import MetricPrefix
+from PhysicalUnit import PhysicalUnit
+
+
+class LengthArray(TypeChecker, PhysicalUnit):
+
+    def __init__(self, meters=None, centimeters=None, millimeters=None, micrometers=None, nanometers=None, kilometers=None):
+        TypeChecker.__init__(self)
+        PhysicalUnit.__init__(self)
+
+        arguments = (kilometers, meters, centimeters, millimeters, micrometers, nanometers)
+        prefixes = (MetricPrefix.Kilo, MetricPrefix.One, MetricPrefix.Centi, MetricPrefix.Milli, MetricPrefix.Micro, MetricPrefix.Nano)
+
+        # checkAtMostOneNonNoneValue would compare arrays elementwise
+        if sum(argument is not None for argument in arguments) > 1:
+            raise ValueError('At most only one non-None argument.')
+
+        self._values = array((), dtype=float)
+        for argument, prefix in zip(arguments, prefixes):
+            if argument is not None:
+                self._values = self._toArray(argument) * prefix
+                break
+        return
+
+    @staticmethod
+    def _toArray(values):
+        # None elements become NaN
+        return array(values, dtype=float)
+
+    @classmethod
+    def fromLengths(cls, lengths):
+        return cls(meters=tuple((None if length is None else length.meters) for length in lengths))
+
+    def toLengths(self):
+        return tuple(self)
+
+    @property
+    def meters(self):
+        '''The underlying array - no copy.'''
+        return self._values
+
+    @meters.setter
+    def meters(self, values):
+        self._values = self._toArray(values)
+        return
+
+
+    @property
+    def centimeters(self):
+        return self._values / MetricPrefix.Centi
+
+    @centimeters.setter
+    def centimeters(self, values):
+        self._values = self._toArray(values) * MetricPrefix.Centi
+        return
+
+
+    @property
+    def millimeters(self):
+        return self._values / MetricPrefix.Milli
+
+    @millimeters.setter
+    def millimeters(self, values):
+        self._values = self._toArray(values) * MetricPrefix.Milli
+        return
+
+
+    @property
+    def micrometers(self):
+        return self._values / MetricPrefix.Micro
+
+    @micrometers.setter
+    def micrometers(self, values):
+        self._values = self._toArray(values) * MetricPrefix.Micro
+        return
+
+
+    @property
+    def nanometers(self):
+        return self._values / MetricPrefix.Nano
+
+    @nanometers.setter
+    def nanometers(self, values):
+        self._values = self._toArray(values) * MetricPrefix.Nano
+        return
+
+
+    @property
+    def picometers(self):
+        return self._values / MetricPrefix.Pico
+
+    @picometers.setter
+    def picometers(self, values):
+        self._values = self._toArray(values) * MetricPrefix.Pico
+        return
+
+
+    @property
+    def kilometers(self):
+        return self._values / MetricPrefix.Kilo
+
+    @kilometers.setter
+    def kilometers(self, values):
+        self._values = self._toArray(values) * MetricPrefix.Kilo
+        return
+
+
+    @property
+    def mask(self):
+        '''True where the length is missing.'''
+        return isnan(self._values)
+
+    @property
+    def shape(self):
+        return self._values.shape
+
+    def __len__(self):
+        return len(self._values)
+
+    def __getitem__(self, key):
+        values = self._values[key]
+        if values.ndim == 0:
+            return Length(meters=(None if isnan(values) else float(values)))
+        return LengthArray(meters=values)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+        return
+
+    def __str__(self):
+        return '{value}m'.format(value=self.meters)
+
+    def __repr__(self):
+        return '{value} - LengthArray at {address}'.format(value=str(self), address = hex(id(self)))
+
+    @staticmethod
+    def _metersOf(other, exceptionMessage):
+        # Lengths broadcast against LengthArrays, a None Length counts as missing
+        TypeChecker.checkType(expectedType=(LengthArray, Length), value=other, exceptionMessage=exceptionMessage)
+        return float('nan') if other.meters is None else other.meters
+
+    def __add__(self, other):
+        return LengthArray(meters=(self._values + self._metersOf(other, exceptionMessage='Only Lengths can be added to LengthArrays')))
+
+    def __sub__(self, other):
+        return LengthArray(meters=(self._values - self._metersOf(other, exceptionMessage='Only Lengths can be subtracted from LengthArrays')))
+
+    def __neg__(self):
+        return LengthArray(meters=-self._values)
+
+    def __mul__(self, other):
+        if isinstance(other, (LengthArray, Length)):
+            raise TypeError('Incompatible type supplied [{type}]: LengthArrays can only be multiplied by numbers.'.format(type=type(other)))
+        return LengthArray(meters=(self._values * asarray(other, dtype=float)))
+
+    def __rmul__(self, other):
+        return self * other
+
+    def __truediv__(self, other):
+        # by a length the ratio, by numbers a LengthArray
+        if isinstance(other, (LengthArray, Length)):
+            return self._values / self._metersOf(other, exceptionMessage='LengthArrays can only be divided by Lengths or numbers')
+        return LengthArray(meters=(self._values / asarray(other, dtype=float)))
+
+    def _compareValues(self, other):
+        return self._metersOf(other, exceptionMessage='LengthArrays can only be compared to Lengths')
+
+    def __lt__(self, other):
+        return self._values < self._compareValues(other)
+
+    def __le__(self, other):
+        return self._values <= self._compareValues(other)
+
+    def __gt__(self, other):
+        return self._values > self._compareValues(other)
+
+    def __ge__(self, other):
+        return self._values >= self._compareValues(other)
+
+    def __eq__(self, other):
+        return self._values == self._compareValues(other)
+
+    def __ne__(self, other):
+        # missing lengths are neither equal nor unequal
+        values = self._compareValues(other)
+        return (self._values != values) & ~self.mask & ~isnan(values)
+
+    # comparisons return arrays, so LengthArrays can't be hashed
+    __hash__ = None
+    # numpy arrays and scalars defer to the reflected operators above
+    __array_ufunc__ = None
+
+
+
+if __name__ == '__main__':
+    from numpy import linspace
+    wavelengths = LengthArray(nanometers=linspace(380, 740, 5))
+    print(wavelengths.nanometers, wavelengths.micrometers, wavelengths[0].nanometers)
+    print((wavelengths + Length(nanometers=10)).nanometers, (wavelengths * 2).nanometers, (wavelengths / Length(nanometers=380)))
+    print(wavelengths < Length(nanometers=500), LengthArray(meters=(1., None)).mask, LengthArray(meters=(1., None))[1].meters)
+    print(LengthArray.fromLengths(wavelengths.toLengths()).nanometers)
+    exit(0)
@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 
+from bisect import bisect_left, bisect_right
+from numpy import asarray, clip, diff, flatnonzero, full, nan, searchsorted, sign, where
 from Range import Range
 
 class LinearInterpolator(object):
@@ -51,18 +53,55 @@ class LinearInterpolator(object):
 
 
 class StepwiseLinearFunctionInterpolator(object):
+    '''Piecewise linear function stored as sorted breakpoint arrays - segments
+        are looked up by binary search instead of scanning all of them.'''
 
     def __init__(self, listOfPoints):
         self.checkAtLeastTwoPoints(listOfPoints=listOfPoints)
         self.checkMonotonity(listOfPoints=listOfPoints)
-        self._listOfPoints = listOfPoints
-        self._listOfInterpolators = self._createListOfInterpolators(listOfPoints=listOfPoints)
+        self._initializeFromArrays(xValues=tuple(point.x for point in listOfPoints),
+                                   yValues=tuple(point.y for point in listOfPoints))
+        return
+
+    @classmethod
+    def fromArrays(cls, xValues, yValues):
+        '''Create from separate x- and y-sequences without building a Point2D per value.'''
+        xValues = asarray(xValues, dtype=float)
+        yValues = asarray(yValues, dtype=float)
+        if xValues.shape != yValues.shape:
+            raise ValueError('x- and y-values differ in length [{xCount}, {yCount}].'.format(xCount=len(xValues), yCount=len(yValues)))
+        cls.checkAtLeastTwoPoints(listOfPoints=xValues)
+        notIncreasing = flatnonzero(diff(xValues) <= 0)
+        if len(notIncreasing) > 0:
+            index = notIncreasing[0]
+            raise ValueError('x-values are not strictly monotonously increasing [{point0}, {point1}].'.format(
+                point0='({x}, {y})'.format(x=xValues[index], y=yValues[index]),
+                point1='({x}, {y})'.format(x=xValues[index + 1], y=yValues[index + 1])))
+        interpolator = cls.__new__(cls)
+        interpolator._initializeFromArrays(xValues=xValues, yValues=yValues)
+        return interpolator
+
+    def _initializeFromArrays(self, xValues, yValues):
+        self._xValues = asarray(xValues, dtype=float)
+        self._yValues = asarray(yValues, dtype=float)
+        x0, x1 = self._xValues[:-1], self._xValues[1:]
+        y0, y1 = self._yValues[:-1], self._yValues[1:]
+        # same formulas as LinearInterpolator, one entry per segment
+        self._acclivities = (y1 - y0) / (x1 - x0)
+        self._offsets = (x1 * y0 - x0 * y1) / (x1 - x0)
+        # plain lists are faster than numpy arrays for scalar look-ups
+        self._xList = self._xValues.tolist()
+        self._acclivitiesList = self._acclivities.tolist()
+        self._offsetsList = self._offsets.tolist()
+        self._yMin = float(self._yValues.min())
+        self._yMax = float(self._yValues.max())
+        self._monotoneRuns = None
         return
 
     @staticmethod
     def checkAtLeastTwoPoints(listOfPoints):
         if len(listOfPoints) < 2:
-            ValueError('At least 2 points required for interpolation, however only {count} provided.'.format(count=len(listOfPoints)))
+            raise ValueError('At least 2 points required for interpolation, however only {count} provided.'.format(count=len(listOfPoints)))
         return
 
     @staticmethod
@@ -77,50 +116,129 @@ class StepwiseLinearFunctionInterpolator(object):
                     raise ValueError('x-values are not strictly monotonously increasing [{point0}, {point1}].'.format(point0=previousPoint, point1=currentPoint))
         return
 
-    @staticmethod
-    def _createListOfInterpolators(listOfPoints):
-        listOfInterpolators = list()
-        previousPoint = None
-        currentPoint = None
-        for point in listOfPoints:
-            previousPoint = currentPoint
-            currentPoint = point
-            if previousPoint is not None:
-                listOfInterpolators.append(LinearInterpolator(point0=previousPoint, point1=currentPoint))
-        return listOfInterpolators
+    @property
+    def xValues(self):
+        return self._xValues
+
+    @property
+    def yValues(self):
+        return self._yValues
 
     def xInRange(self, x):
-        return Range(min=self._listOfPoints[0].x, max=self._listOfPoints[-1].x).checkValueInRange(value=x)
+        return Range(min=self._xList[0], max=self._xList[-1]).checkValueInRange(value=x)
 
     def yInRange(self, y):
-        yMin = min((point.y for point in self._listOfPoints))
-        yMax = max((point.y for point in self._listOfPoints))
-        return Range(min=yMin, max=yMax).checkValueInRange(value=y)
+        return Range(min=self._yMin, max=self._yMax).checkValueInRange(value=y)
+
+    def _segmentIndex(self, x):
+        # the first segment whose closed x-range contains x
+        return min(max(bisect_left(self._xList, x) - 1, 0), len(self._xList) - 2)
 
     def at(self, x):
         # assume uniqueness in x [for every x-value exactly one y-value]
         y = None
-        for linearInterpolator in self._listOfInterpolators:
-            if linearInterpolator.xInRange(x=x):
-                y = linearInterpolator.at(x=x)
-                break
+        if self._xList[0] <= x <= self._xList[-1]:
+            index = self._segmentIndex(x=x)
+            y = self._acclivitiesList[index] * x + self._offsetsList[index]
         return y
 
+    def atArray(self, xs):
+        '''Evaluate for a whole array of x-values - NaN where at() would return None.'''
+        xs = asarray(xs, dtype=float)
+        indices = clip(searchsorted(self._xValues, xs, side='left') - 1, 0, len(self._xValues) - 2)
+        ys = self._acclivities[indices] * xs + self._offsets[indices]
+        return where((xs >= self._xValues[0]) & (xs <= self._xValues[-1]), ys, nan)
+
+    def _getMonotoneRuns(self):
+        # split the y-values into maximal strictly monotone runs [e.g. the two branches around an extremum],
+        # constant segments are kept as runs of their own - built on first use only
+        if self._monotoneRuns is None:
+            directions = sign(diff(self._yValues)).tolist()
+            runs = list()
+            start = 0
+            for index in range(1, len(directions) + 1):
+                if (index == len(directions)) or (directions[index] != directions[start]) or (directions[start] == 0):
+                    runs.append(_MonotoneRun(xValues=self._xValues, yValues=self._yValues,
+                                             start=start, end=index, direction=directions[start]))
+                    start = index
+            self._monotoneRuns = tuple(runs)
+        return self._monotoneRuns
+
+    def whereAll(self, y):
+        '''All x-values for y, increasing - one binary search per monotone run.'''
+        xValues = list()
+        previousRun = None
+        for run in self._getMonotoneRuns():
+            # both runs contain their common point - only report it once
+            sharedPoint = (previousRun is not None) and (previousRun.end == run.start) and (y == self._yValues[run.start])
+            previousRun = run
+            if run.yMin <= y <= run.yMax:
+                segmentIndex = run.segmentIndex(y=y)
+                acclivity = self._acclivitiesList[segmentIndex]
+                offset = self._offsetsList[segmentIndex]
+                if acclivity == 0:
+                    raise ValueError('Can\'t determine a unique x for a constant function [y = {acclivity} * x + {offset}]'.format(acclivity=acclivity, offset=offset))
+                if not sharedPoint:
+                    xValues.append((y - offset) / acclivity)
+        return tuple(xValues)
+
+    def whereAllArray(self, ys, uniqueSharedPoints=True):
+        '''All x-values for a whole array of y-values. Returns an array of shape (len(ys), number of monotone
+            runs) - column r holds the x-value on the r-th run, NaN where there is none. With uniqueSharedPoints
+            disabled, a point shared by two adjacent runs [an extremum] is reported in both columns.'''
+        ys = asarray(ys, dtype=float)
+        runs = self._getMonotoneRuns()
+        xValues = full((len(ys), len(runs)), nan)
+        for runIndex, run in enumerate(runs):
+            inRun = (ys >= run.yMin) & (ys <= run.yMax)
+            if run.direction == 0:
+                if inRun.any():
+                    raise ValueError('Can\'t determine a unique x for a constant function [y = 0.0 * x + {offset}]'.format(offset=run.yMin))
+                continue
+            segmentIndices = run.segmentIndexArray(ys=ys[inRun])
+            xValues[inRun, runIndex] = (ys[inRun] - self._offsets[segmentIndices]) / self._acclivities[segmentIndices]
+            if uniqueSharedPoints and (runIndex > 0) and (runs[runIndex - 1].end == run.start):
+                # both runs contain their common point - only report it once
+                xValues[ys == self._yValues[run.start], runIndex] = nan
+        return xValues
+
     def where(self, y, index=0):
         # non-uniqueness in y [one y-value for potentially more than one x-value]
-        xValues = list()
+        xValues = self.whereAll(y=y)
         x = None
-        for linearInterpolator in self._listOfInterpolators:
-            if linearInterpolator.yInRange(y=y):
-                tempX = linearInterpolator.where(y=y)
-                if (len(xValues) == 0) or ((len(xValues) > 0) and (xValues[-1] != tempX)):
-                    xValues.append(tempX)
-                if len(xValues) == (index + 1):
-                    x = xValues[index]
-                    break
+        if index < len(xValues):
+            x = xValues[index]
         return x
 
 
+class _MonotoneRun(object):
+    '''Breakpoints start..end [inclusive] of a StepwiseLinearFunctionInterpolator with strictly monotone y-values.'''
+
+    def __init__(self, xValues, yValues, start, end, direction):
+        self.start = start
+        self.end = end
+        self.direction = direction
+        # ascending y-values for bisection, descending runs are stored reversed
+        ys = yValues[start:end + 1]
+        self._sortedYValues = ys if direction >= 0 else ys[::-1]
+        self._sortedYList = self._sortedYValues.tolist()
+        self.yMin = self._sortedYList[0]
+        self.yMax = self._sortedYList[-1]
+        return
+
+    def segmentIndex(self, y):
+        # the first segment [in x-order] whose closed y-range contains y
+        numberOfSegments = self.end - self.start
+        if self.direction >= 0:
+            return self.start + min(max(bisect_left(self._sortedYList, y) - 1, 0), numberOfSegments - 1)
+        return self.end - 1 - min(max(bisect_right(self._sortedYList, y) - 1, 0), numberOfSegments - 1)
+
+    def segmentIndexArray(self, ys):
+        numberOfSegments = self.end - self.start
+        if self.direction >= 0:
+            return self.start + clip(searchsorted(self._sortedYValues, ys, side='left') - 1, 0, numberOfSegments - 1)
+        return self.end - 1 - clip(searchsorted(self._sortedYValues, ys, side='right') - 1, 0, numberOfSegments - 1)
+
 
 if __name__ == '__main__':
     from Point import Point2D
@@ -148,4 +266,9 @@ if __name__ == '__main__':
     print(bla.where(0., 1))
     print(bla.where(-.5, 1))
 
+    print('    ----    ')
+
+    print(bla.whereAll(.5))
+    print(bla.whereAllArray((-.5, 0., .5, 1.)))
+
     exit(0)
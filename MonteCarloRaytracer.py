@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+'''Monte Carlo counterpart of the deterministic height sweep.
+
+    Incidence heights are drawn from the incident power profile, traced in
+    batches through the Fresnel chain of RaindropCalculationsBatch, and the
+    transmitted TE/TM power is added into exit-angle histograms. Only the
+    per-bin sums of the power and of its square are kept, so memory does not
+    grow with the number of rays, and the standard error per bin follows
+    from them. Each ray carries totalIncidentPower / numberOfRays.
+
+    Heights are drawn by inverse transform sampling of the profile's
+    cumulative power. With a separate samplingProfile [importance sampling,
+    e.g. concentrated around the rainbow height] every ray is weighted by
+    the ratio of the normalized profile densities at its height instead.'''
+
+from numpy import asarray, bincount, sqrt, zeros
+from numpy.random import default_rng
+from IncidentPowerProfile import UniformIncidentPowerProfile
+from PowerRedistribution import binCentersFromEdges
+from RaindropCalculationsBatch import RaindropCalculationsBatch
+
+
+class MonteCarloRaytracer(object):
+
+    Channels = ('TE', 'TM', 'TETM')
+
+    def __init__(self, refractiveIndexOuter, refractiveIndexInner, binEdges, batchSize=1000000, seed=None,
+                 incidentPowerProfile=None, samplingProfile=None):
+        '''incidentPowerProfile is an IncidentPowerProfile, by default the uniform beam. The heights are drawn
+            from samplingProfile if given, which must not vanish where incidentPowerProfile doesn't.'''
+        if incidentPowerProfile is None:
+            incidentPowerProfile = UniformIncidentPowerProfile()
+        self.refractiveIndexOuter = refractiveIndexOuter
+        self.refractiveIndexInner = refractiveIndexInner
+        self.binEdges = asarray(binEdges, dtype=float)
+        self.batchSize = batchSize
+        self.seed = seed
+        self.incidentPowerProfile = incidentPowerProfile
+        self.samplingProfile = samplingProfile
+        self.totalIncidentPower = incidentPowerProfile.totalPower
+        self._generator = default_rng(seed)
+        self.numberOfRays = 0
+        # per channel and bin - sum of the transmitted power fractions and of their squares
+        self._sums = zeros((len(self.Channels), len(self.binEdges) - 1))
+        self._sumsOfSquares = zeros((len(self.Channels), len(self.binEdges) - 1))
+        return
+
+    @property
+    def binCenters(self):
+        return binCentersFromEdges(binEdges=self.binEdges)
+
+    def _traceBatch(self, size):
+        if self.samplingProfile is None:
+            heights = self.incidentPowerProfile.sampleHeights(generator=self._generator, size=size)
+            weights = 1.
+        else:
+            heights = self.samplingProfile.sampleHeights(generator=self._generator, size=size)
+            # ratio of the normalized densities - the power a ray carries relative to totalIncidentPower / numberOfRays
+            weights = (self.incidentPowerProfile.powerDensityArray(heights) / self.totalIncidentPower) / \
+                      (self.samplingProfile.powerDensityArray(heights) / self.samplingProfile.totalPower)
+        raindropCalculations = RaindropCalculationsBatch(refractiveIndexOuter=self.refractiveIndexOuter,
+                                                         refractiveIndexInner=self.refractiveIndexInner,
+                                                         incidenceHeights=heights)
+        angles = raindropCalculations.eta0Internal
+        powersTE = raindropCalculations.transmittedPowerTransversalElectric * weights
+        powersTM = raindropCalculations.transmittedPowerTransversalMagnetic * weights
+        # rays outside of the bins still count as traced
+        numberOfBins = len(self.binEdges) - 1
+        bins = self.binEdges.searchsorted(angles, side='right') - 1
+        bins[angles == self.binEdges[-1]] = numberOfBins - 1
+        inside = (bins >= 0) & (bins < numberOfBins)
+        bins = bins[inside]
+        for channel, powers in enumerate((powersTE, powersTM, (powersTE + powersTM) / 2.)):
+            powers = powers[inside]
+            self._sums[channel] += bincount(bins, weights=powers, minlength=numberOfBins)
+            self._sumsOfSquares[channel] += bincount(bins, weights=powers ** 2, minlength=numberOfBins)
+        self.numberOfRays += size
+        return
+
+    def trace(self, numberOfRays):
+        '''Trace further rays - may be called repeatedly, the histograms keep accumulating.'''
+        for start in range(0, numberOfRays, self.batchSize):
+            self._traceBatch(size=min(self.batchSize, numberOfRays - start))
+        return self
+
+    def _checkTraced(self):
+        if self.numberOfRays == 0:
+            raise RuntimeError('No rays traced yet - call trace first.')
+        return
+
+    @property
+    def powerBins(self):
+        '''Power per bin for each channel, shape (channels, bins).'''
+        self._checkTraced()
+        return self.totalIncidentPower * self._sums / self.numberOfRays
+
+    @property
+    def powerBinsStandardError(self):
+        # standard error of the mean of the per ray contribution to each bin
+        self._checkTraced()
+        means = self._sums / self.numberOfRays
+        variances = (self._sumsOfSquares / self.numberOfRays - means ** 2).clip(min=0.)
+        return self.totalIncidentPower * sqrt(variances / self.numberOfRays)
+
+    @property
+    def powerDensity(self):
+        '''Power per angle at the bin centers for each channel.'''
+        return self.powerBins / (self.binEdges[1:] - self.binEdges[:-1])
+
+    @property
+    def powerDensityStandardError(self):
+        return self.powerBinsStandardError / (self.binEdges[1:] - self.binEdges[:-1])
+
+
+
+if __name__ == '__main__':
+    from time import perf_counter
+    from numpy import abs as absArray, full, linspace
+    from PowerRedistribution import binEdgesFromRange, redistributePowerToBins
+    refractiveIndexInner = 1.3347
+    heights = linspace(-1, 1, 1000001)
+    raindropCalculations = RaindropCalculationsBatch(refractiveIndexOuter=1., refractiveIndexInner=refractiveIndexInner,
+                                                     incidenceHeights=heights)
+    binEdges = binEdgesFromRange(minimum=min(raindropCalculations.eta0Internal),
+                                 maximum=max(raindropCalculations.eta0Internal), numberOfBins=201)
+    deterministic = redistributePowerToBins(heights=heights, angles=raindropCalculations.eta0Internal,
+                                            powerDensitiesHeight=full(len(heights), .5) * raindropCalculations.transmittedPowerTransversalElectric,
+                                            binEdges=binEdges)[0]
+
+    start = perf_counter()
+    tracer = MonteCarloRaytracer(refractiveIndexOuter=1., refractiveIndexInner=refractiveIndexInner, binEdges=binEdges,
+                                 seed=0).trace(numberOfRays=10000000)
+    print('{rays} rays: {seconds:.2f}s'.format(rays=tracer.numberOfRays, seconds=perf_counter() - start))
+    deviations = absArray(tracer.powerBins[0] - deterministic) / tracer.powerBinsStandardError[0]
+    print('TE deviation from the deterministic path in standard errors - mean {mean:.2f}, max {maximum:.2f}'.format(
+        mean=deviations.mean(), maximum=deviations.max()))
+    exit(0)
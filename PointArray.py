@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+'''Class for storing many 2D points in one numpy array.'''
+
+from numpy import asarray, broadcast_arrays, stack
+from TypeHelpers import TypeChecker
+from Point import Point2D
+from Vector import Vector2D
+from VectorArray import Vector2DArray
+
+class Point2DArray(TypeChecker):
+
+    def __init__(self, x, y):
+        TypeChecker.__init__(self)
+        # x and y are the rows of one array of shape (2, ...)
+        self.xy = stack(broadcast_arrays(asarray(x, dtype=float), asarray(y, dtype=float)))
+        return
+
+    @classmethod
+    def fromXY(cls, xy):
+        '''From an array of shape (2, ...) - no copy.'''
+        points = cls.__new__(cls)
+        TypeChecker.__init__(points)
+        points.xy = asarray(xy, dtype=float)
+        return points
+
+    @property
+    def x(self):
+        return self.xy[0]
+
+    @property
+    def y(self):
+        return self.xy[1]
+
+    def __len__(self):
+        return self.xy.shape[1]
+
+    def __getitem__(self, key):
+        xy = self.xy[:, key]
+        if xy.ndim == 1:
+            return Point2D(x=float(xy[0]), y=float(xy[1]))
+        return Point2DArray.fromXY(xy)
+
+    def __str__(self):
+        return '({x}, {y})'.format(x=self.x, y = self.y)
+
+    def __repr__(self):
+        return '{value} - Point2DArray at {address}'.format(value=str(self), address = hex(id(self)))
+
+    def __add__(self, other):
+        # Vector2Ds broadcast against Point2DArrays
+        self.checkType(expectedType=(Vector2DArray, Vector2D), value=other, exceptionMessage='Only Vectors can be added to points')
+        return Point2DArray(x=(self.x + other.x), y=(self.y + other.y))
+
+    def __sub__(self, other):
+        self.checkType(expectedType=(Vector2DArray, Vector2D), value=other, exceptionMessage='Only Vectors can be added to points')
+        return self + -other
+
+    def __neg__(self):
+        return Point2DArray.fromXY(-self.xy)
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+'''Forward redistribution of power from incidence heights to exit-angle bins.
+
+    Every segment between two neighbouring heights carries the power of its
+    trapezoid-integrated power density. Within the segment the exit angle is
+    assumed to depend linearly on the height, so that power is spread evenly
+    over the angles the segment covers and added to the bins it overlaps.
+    This conserves energy exactly [up to rounding] and needs no inverse of the
+    height -> angle relation.'''
+
+from numpy import asarray, atleast_2d, bincount, clip, concatenate, cumsum, diff, interp, isfinite, linspace, minimum, searchsorted, \
+                  where, zeros
+
+
+def binEdgesFromRange(minimum, maximum, numberOfBins):
+    return linspace(minimum, maximum, numberOfBins + 1)
+
+def binCentersFromEdges(binEdges):
+    binEdges = asarray(binEdges, dtype=float)
+    return (binEdges[1:] + binEdges[:-1]) / 2.
+
+def binEdgesFromCenters(binCenters):
+    # midway between the centers, the outer edges mirrored at the outer centers
+    binCenters = asarray(binCenters, dtype=float)
+    midpoints = (binCenters[1:] + binCenters[:-1]) / 2.
+    return concatenate(((2 * binCenters[0] - midpoints[0],), midpoints, (2 * binCenters[-1] - midpoints[-1],)))
+
+def rebinPowerDensities(binCenters, powerDensities, newBinCenters):
+    '''Power densities per angle as averages over the bins around newBinCenters - the cumulative power is
+        interpolated at the new bin edges, so the power is conserved within the overlap of both ranges. Missing
+        [NaN] and infinite densities [e.g. the analytic density at the caustic] carry no power.'''
+    binEdges = binEdgesFromCenters(binCenters)
+    powerDensities = asarray(powerDensities, dtype=float)
+    powers = where(isfinite(powerDensities), powerDensities, 0.) * diff(binEdges)
+    cumulativePowers = concatenate(((0.,), cumsum(powers)))
+    newBinEdges = binEdgesFromCenters(newBinCenters)
+    return diff(interp(newBinEdges, binEdges, cumulativePowers)) / diff(newBinEdges)
+
+def _binIndices(binEdges, values):
+    # index of the bin containing each value, the last bin is closed to the right
+    return clip(searchsorted(binEdges, values, side='right') - 1, 0, len(binEdges) - 2)
+
+def redistributePowerToBins(heights, angles, powerDensitiesHeight, binEdges):
+    '''Power per angle bin for each channel.
+
+        heights              - increasing incidence heights, shape (N,)
+        angles               - exit angle for each height, shape (N,)
+        powerDensitiesHeight - power density per height for each channel, shape (channels, N) or (N,)
+        binEdges             - increasing angle bin edges, shape (M + 1,)
+
+        Returns an array of shape (channels, M). Power of segments outside the
+        bin edges is clipped away.'''
+    heights = asarray(heights, dtype=float)
+    angles = asarray(angles, dtype=float)
+    binEdges = asarray(binEdges, dtype=float)
+    powerDensitiesHeight = atleast_2d(asarray(powerDensitiesHeight, dtype=float))
+    numberOfBins = len(binEdges) - 1
+
+    # power carried by each segment [trapezoid rule - exact for densities linear in height]
+    segmentPowers = diff(heights) * (powerDensitiesHeight[:, 1:] + powerDensitiesHeight[:, :-1]) / 2.
+
+    # angle range covered by each segment, limited to the bins
+    anglesLowUnclipped = minimum(angles[1:], angles[:-1])
+    fullWidths = abs(diff(angles))
+    anglesLow = clip(anglesLowUnclipped, binEdges[0], binEdges[-1])
+    anglesHigh = clip(anglesLowUnclipped + fullWidths, binEdges[0], binEdges[-1])
+    binLow = _binIndices(binEdges=binEdges, values=anglesLow)
+    binHigh = _binIndices(binEdges=binEdges, values=anglesHigh)
+
+    # fraction of each segment's power within the bins [1 unless clipped]
+    isPointLike = fullWidths == 0
+    inside = where(isPointLike,
+                   (anglesLowUnclipped >= binEdges[0]) & (anglesLowUnclipped <= binEdges[-1]),
+                   (anglesHigh - anglesLow) / where(isPointLike, 1., fullWidths))
+
+    singleBin = binLow == binHigh
+    spanning = ~singleBin
+    binWidths = diff(binEdges)
+
+    powerBins = zeros((len(powerDensitiesHeight), numberOfBins))
+    for channel, powers in enumerate(segmentPowers):
+        # segments within one bin - add their power as a whole
+        powerBins[channel] += bincount(binLow[singleBin], weights=(powers * inside)[singleBin], minlength=numberOfBins)
+
+        # segments over several bins - power per angle, split into the partial first and last bin and the
+        # fully covered bins in between [accumulated as a difference array]
+        densities = powers[spanning] / fullWidths[spanning]
+        low = binLow[spanning]
+        high = binHigh[spanning]
+        powerBins[channel] += bincount(low, weights=densities * (binEdges[low + 1] - anglesLow[spanning]), minlength=numberOfBins)
+        powerBins[channel] += bincount(high, weights=densities * (anglesHigh[spanning] - binEdges[high]), minlength=numberOfBins)
+        densityDifferences = bincount(low + 1, weights=densities, minlength=numberOfBins + 1) - \
+                             bincount(high, weights=densities, minlength=numberOfBins + 1)
+        powerBins[channel] += cumsum(densityDifferences)[:numberOfBins] * binWidths
+    return powerBins
+
+def redistributePowerDensity(heights, angles, powerDensitiesHeight, numberOfBins=None, binEdges=None):
+    '''Power density per angle at the bin centers for each channel. Bins are either given
+        explicitly or spread evenly over the range of the angles.'''
+    if binEdges is None:
+        binEdges = binEdgesFromRange(minimum=min(angles), maximum=max(angles), numberOfBins=numberOfBins)
+    binEdges = asarray(binEdges, dtype=float)
+    powerBins = redistributePowerToBins(heights=heights, angles=angles,
+                                        powerDensitiesHeight=powerDensitiesHeight, binEdges=binEdges)
+    return binCentersFromEdges(binEdges=binEdges), powerBins / diff(binEdges)
+
+
+
+if __name__ == '__main__':
+    from numpy import full
+    from RaindropCalculationsBatch import RaindropCalculationsBatch
+    heights = linspace(-1, 1, 100001)
+    raindropCalculations = RaindropCalculationsBatch(refractiveIndexOuter=1., refractiveIndexInner=1.3347,
+                                                     incidenceHeights=heights)
+    powerDensities = (full(len(heights), .5) * raindropCalculations.transmittedPowerTransversalElectric,
+                      full(len(heights), .5) * raindropCalculations.transmittedPowerTransversalMagnetic)
+    binEdges = binEdgesFromRange(minimum=min(raindropCalculations.eta0Internal),
+                                 maximum=max(raindropCalculations.eta0Internal), numberOfBins=1001)
+    powerBins = redistributePowerToBins(heights=heights, angles=raindropCalculations.eta0Internal,
+                                        powerDensitiesHeight=powerDensities, binEdges=binEdges)
+    print('Power per height [TE, TM]: {power}'.format(
+        power=tuple(sum(diff(heights) * (density[1:] + density[:-1]) / 2.) for density in powerDensities)))
+    print('Power per angle  [TE, TM]: {power}'.format(power=tuple(powerBins.sum(axis=1))))
+    exit(0)
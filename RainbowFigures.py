@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+
+'''Figures of the rainbow calculation, built once and updated per result.
+
+    Creating a figure with its axes, legends and artists costs far more than
+    changing the data of existing artists, so every figure is a template:
+    it is set up once [per process, see the plot functions at the end] and
+    update only replaces the data of its Line2D, LineCollection and scatter
+    artists. A ray fan is a single LineCollection with one polyline per
+    ray, not one plot call per segment.
+
+    The plots of the compute modules' inputs [Fresnel coefficients,
+    refractive index, incident power profiles] live here as well, so that
+    only this module imports matplotlib.'''
+
+from functools import lru_cache
+from matplotlib import pyplot
+from matplotlib.collections import LineCollection
+from numpy import concatenate, linspace
+from Angle import Angle
+from RaindropCalculationsBatch import RaindropCalculationsBatch
+
+
+class ObjectZorder(object):
+    # bigger values are to the front
+    Raindrop = 1
+    MeetingPoints = 2
+    Lightray = 3
+
+class ObjectColor(object):
+    MeetingPoints = (0.,.8,0.)
+    Lightray = (.8,0.,0.)
+    PowerTE = (0,.5,0)
+    PowerTM = (.5,0,0)
+    PowerTETMmixed = (0,0,.5)
+
+
+class WavelengthFigure(object):
+    '''eta0 and the transmitted powers over the incidence height, and the power densities over the exit angle.'''
+
+    PowerLabels = ('TE-i', 'TM-i', '(TE-i+TM-i)/2')
+    PowerColors = (ObjectColor.PowerTE, ObjectColor.PowerTM, ObjectColor.PowerTETMmixed)
+
+    def __init__(self):
+        self.figure, self.axes = pyplot.subplots(3, 1)
+        self.title = self.figure.suptitle('')
+
+        axis = self.axes[0]
+        self.lineEta0, = axis.plot((), (), color=ObjectColor.Lightray)
+        axis.set_xlabel('height [nu]')  # normalize unit
+        axis.set_ylabel('eta0 [°]')
+
+        axis = self.axes[1]
+        self.linesPowersHeights = tuple(axis.plot((), (), color=color, label=label)[0]
+                                        for color, label in zip(self.PowerColors, self.PowerLabels))
+        axis.set_xlabel('height [nu]')  # normalize unit
+        axis.set_ylabel('transmitted power [nu]')
+        axis.legend(loc='upper center')
+
+        axis = self.axes[2]
+        self.linesPowersAngles = tuple(axis.plot((), (), color=color, label=label)[0]
+                                       for color, label in zip(self.PowerColors, self.PowerLabels))
+        axis.set_xlabel('eta0 [°]')
+        axis.set_ylabel('transmitted power [nu]')  # normalize unit
+        axis.legend(loc='upper right')
+        return
+
+    def update(self, result):
+        '''Show a WavelengthResult.'''
+        self.title.set_text('Refractive indices inner / outer = {relation}'.format(
+            relation=result.refractiveIndexInner / result.refractiveIndexOuter))
+        self.lineEta0.set_data(result.heights, result.rays.degrees('eta0Internal'))
+        for line, powers in zip(self.linesPowersHeights, (result.powersTEheightsInternal,
+                                                          result.powersTMheightsInternal,
+                                                          result.powersTETMheightsInternal)):
+            line.set_data(result.heights, powers)
+        eta0sExcidenceDegree = Angle.radiansToDegrees(result.eta0sExcidence)
+        for line, powerDensities in zip(self.linesPowersAngles, (result.powerExcidenceDensityTE,
+                                                                 result.powerExcidenceDensityTM,
+                                                                 result.powerExcidenceDensityTETM)):
+            line.set_data(eta0sExcidenceDegree, powerDensities)
+        for axis in self.axes:
+            axis.relim()
+            axis.autoscale_view()
+        return self
+
+    def save(self, fileName, dpi=300):
+        self.figure.savefig(fname=fileName, dpi=dpi)
+        return
+
+    def close(self):
+        pyplot.close(self.figure)
+        return
+
+
+class RayFanFigure(object):
+    '''Rays through the raindrop - one polyline per incidence height.'''
+
+    def __init__(self, limits=(-1.5, 1.5)):
+        self.figure, self.axis = pyplot.subplots()
+        self.axis.set_xlim(limits)
+        self.axis.set_ylim(limits)
+        self.axis.set_aspect('equal')
+        self.title = self.axis.set_title('')
+        self.raindrop = pyplot.Circle((0, 0), 1, fill=True, zorder=ObjectZorder.Raindrop)
+        self.axis.add_patch(self.raindrop)
+        self.rays = LineCollection((), colors=(ObjectColor.Lightray,), zorder=ObjectZorder.Lightray)
+        self.axis.add_collection(self.rays)
+        self.meetingPoints = self.axis.scatter((), (), marker='.', color=ObjectColor.MeetingPoints,
+                                               zorder=ObjectZorder.MeetingPoints)
+        return
+
+    def update(self, raindropCalculations, xStart=2., xEnd=2.):
+        '''Show the rays of a one dimensional RaindropCalculationsBatch, incident from x = xStart and emerging up
+            to x = xEnd.'''
+        relation = raindropCalculations.refractiveIndexInner / raindropCalculations.refractiveIndexOuter
+        heights = raindropCalculations.incidenceHeights
+        if len(heights) == 1:
+            self.title.set_text('Incident height = {height}, refractive indices inner / outer = {relation}'.format(
+                height=heights[0], relation=relation))
+        else:
+            self.title.set_text('{count} incident heights, refractive indices inner / outer = {relation}'.format(
+                count=len(heights), relation=relation))
+        colorValue = 2. / (1. + relation)
+        self.raindrop.set_color((colorValue, colorValue, colorValue))
+        self.rays.set_segments(raindropCalculations.rayPaths(xStart=xStart, xEnd=xEnd))
+        self.meetingPoints.set_offsets(concatenate((raindropCalculations.pointBeta.xy,
+                                                    raindropCalculations.pointGamma.xy,
+                                                    raindropCalculations.pointDelta.xy), axis=1).T)
+        return self
+
+    def save(self, fileName, dpi=None):
+        self.figure.savefig(fname=fileName, dpi=dpi)
+        return
+
+    def close(self):
+        pyplot.close(self.figure)
+        return
+
+
+# one template of each per process - renderer processes reuse them for every task
+@lru_cache(maxsize=1)
+def wavelengthFigure():
+    return WavelengthFigure()
+
+@lru_cache(maxsize=1)
+def rayFanFigure():
+    return RayFanFigure()
+
+def plotWavelengthResult(result, directory, fileFormat='png'):
+    wavelengthFigure().update(result=result).save(fileName='{directory}/results_{wavelength:.2F}.{fileFormat}'.format(
+        wavelength=result.wavelength.nanometers,
+        directory=directory,
+        fileFormat=fileFormat
+    ), dpi=300)
+    return
+
+def plotSummary(wavelengthsNanometers, eta0sExtrema, directory, fileFormat='png'):
+    '''Angle and power density of the extrema [see collectExtrema] over the wavelength.'''
+    figure, (axis0, axis1) = pyplot.subplots(1, 2)
+    pyplot.title('Maximum excidence angle depending on wavelength for water.')
+    axis = axis0
+    axis.set_xlabel('wavelength [nm]')
+    axis.set_ylabel('eta0 [°]')
+    for key, value in eta0sExtrema.items():
+        axis.plot(wavelengthsNanometers, tuple(maximum.x.degrees for maximum in value), label=key)
+    axis.legend(loc='upper right')
+
+    axis = axis1
+    axis.set_xlabel('wavelength [nm]')
+    axis.set_ylabel('maximum power density [a.u.]')
+    for key, value in eta0sExtrema.items():
+        axis.plot(wavelengthsNanometers, tuple(maximum.y for maximum in value), label=key)
+    axis.legend(loc='upper right')
+
+    figure.savefig(fname='{directory}/results_overall.{fileFormat}'.format(
+        directory=directory,
+        fileFormat=fileFormat
+    ), dpi=300)
+    return figure
+
+def plotRayFan(raindropCalculations, directory):
+    '''Rays of a one dimensional RaindropCalculationsBatch.'''
+    heights = raindropCalculations.incidenceHeights
+    rayFanFigure().update(raindropCalculations=raindropCalculations).save(
+        fileName='{directory}/result_i{indicesRelation:.2F}_h{heightMin:.2F}_{heightMax:.2F}_n{count}.png'.format(
+            indicesRelation=(raindropCalculations.refractiveIndexInner / raindropCalculations.refractiveIndexOuter),
+            heightMin=heights.min(), heightMax=heights.max(), count=len(heights),
+            directory=directory))
+    return
+
+def createFigure(calculation, directory):
+    '''Ray of a single RaindropCalculations.'''
+    rayFanFigure().update(raindropCalculations=RaindropCalculationsBatch(
+        refractiveIndexOuter=calculation.refractiveIndexOuter,
+        refractiveIndexInner=calculation.refractiveIndexInner,
+        incidenceHeights=(calculation.incidenceHeight,))).save(
+        fileName='{directory}/result_i{indicesRelation:.2F}_h{height:.2F}.png'.format(
+            indicesRelation=(calculation.refractiveIndexInner / calculation.refractiveIndexOuter),
+            height=calculation.incidenceHeight,
+            directory=directory))
+    return
+
+def plotFresnelCoefficients(fresnelCoefficients, numberOfAngles=150):
+    '''Power [left] and amplitude [right] coefficients of a FresnelCoefficients over the incidence angle.'''
+    angles = tuple(Angle(degrees=value) for value in linspace(start=0., stop=90, num=numberOfAngles))
+    anglesDegrees = tuple(angle.degrees for angle in angles)
+    figure, (axis0, axis1) = pyplot.subplots(1, 2)
+    for coefficient in (fresnelCoefficients.transmittanceTransversalElectric,
+                        fresnelCoefficients.reflectanceTransversalElectric,
+                        fresnelCoefficients.transmittanceTransversalMagnetic,
+                        fresnelCoefficients.reflectanceTransversalMagnetic):
+        axis0.plot(anglesDegrees, tuple(coefficient(incidenceAngle=angle) for angle in angles))
+    for coefficient in (fresnelCoefficients.transmittanceTransversalElectricAmplitude,
+                        fresnelCoefficients.reflectanceTransversalElectricAmplitude,
+                        fresnelCoefficients.transmittanceTransversalMagneticAmplitude,
+                        fresnelCoefficients.reflectanceTransversalMagneticAmplitude):
+        axis1.plot(anglesDegrees, tuple(coefficient(incidenceAngle=angle) for angle in angles))
+    return figure
+
+def plotRefractiveIndex(refractiveIndex, wavelengths):
+    '''Refractive index over the wavelengths [Lengths].'''
+    figure, axis = pyplot.subplots()
+    axis.plot(tuple(wavelength.nanometers for wavelength in wavelengths),
+              tuple(refractiveIndex.refractiveIndex(wavelength=wavelength) for wavelength in wavelengths))
+    return figure
+
+def plotIncidentPowerProfiles(profiles, heights):
+    '''Power density of IncidentPowerProfiles over the normalized heights.'''
+    figure, axis = pyplot.subplots()
+    for profile in profiles:
+        axis.plot(heights, profile.powerDensityArray(heights), label=type(profile).__name__)
+    axis.legend()
+    return figure
+
+
+
+if __name__ == '__main__':
+    from FresnelCoefficients import FresnelCoefficients, Medium
+    from IncidentPowerProfile import GaussianIncidentPowerProfile, UniformIncidentPowerProfile
+    from Length import Length
+    from RefractiveIndex import RefractiveIndex2007DaimonMasumura20CWater
+    plotFresnelCoefficients(FresnelCoefficients(mediumFrom=Medium(refractiveIndex=1.5, magneticPermeability=1),
+                                                mediumTo=Medium(refractiveIndex=1., magneticPermeability=1)))
+    plotRefractiveIndex(RefractiveIndex2007DaimonMasumura20CWater(),
+                        wavelengths=tuple(Length(nanometers=value) for value in range(180, 1130, 5)))
+    plotIncidentPowerProfiles((UniformIncidentPowerProfile(), GaussianIncidentPowerProfile(width=.3)),
+                              heights=linspace(-2., 2., 101))
+    pyplot.show()
+    exit(0)
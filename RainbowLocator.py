@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+'''Locating the rainbow angle and the intensity peaks beyond the sampling grid.
+
+    The geometric rainbow is where eta0Internal is stationary in the incidence
+    height. deta0InternaldH is 2 - 4 n0/n1 at h = 0, negative for
+    1 < n1/n0 < 2 [beyond, there is no primary rainbow], and diverges
+    to +inf for h -> 1, so its root is bracketed by (0, 1) and found with
+    Newton steps that fall back to bisection whenever they would leave the
+    bracket. Intensity peaks on a grid are refined by the vertex of the
+    parabola through the maximum and its two neighbours.'''
+
+from math import floor
+from Angle import Angle
+from Point import Point2D as Point
+from RaindropCalculations import RaindropCalculations
+
+
+def _d2eta0InternaldH2(refractiveIndexOuter, refractiveIndexInner, height):
+    relation = refractiveIndexOuter / refractiveIndexInner
+    return 2 * height / (1 - height ** 2) ** 1.5 - 4 * relation ** 3 * height / (1 - (relation * height) ** 2) ** 1.5
+
+def rainbowHeight(refractiveIndexOuter, refractiveIndexInner, tolerance=1e-15, maximumIterations=100):
+    '''Incidence height of the geometric rainbow - the root of deta0InternaldH in (0, 1).'''
+    if refractiveIndexInner <= refractiveIndexOuter:
+        raise ValueError('A rainbow needs the inner refractive index to be larger than the outer one.')
+
+    def deta0InternaldH(height):
+        return RaindropCalculations(refractiveIndexOuter=refractiveIndexOuter, refractiveIndexInner=refractiveIndexInner,
+                                    incidenceHeight=height).deta0InternaldH.radians
+
+    if not deta0InternaldH(0.) < 0:
+        raise ValueError('A rainbow needs the inner refractive index to be less than twice the outer one.')
+
+    low, high = 0., 1.
+    height = (low + high) / 2.
+    for _ in range(maximumIterations):
+        value = deta0InternaldH(height)
+        if value < 0:
+            low = height
+        else:
+            high = height
+        step = value / _d2eta0InternaldH2(refractiveIndexOuter=refractiveIndexOuter,
+                                          refractiveIndexInner=refractiveIndexInner, height=height)
+        nextHeight = height - step
+        if not (low < nextHeight < high):
+            nextHeight = (low + high) / 2.
+        if abs(nextHeight - height) <= tolerance:
+            return nextHeight
+        height = nextHeight
+    return height
+
+def rainbowAngle(refractiveIndexOuter, refractiveIndexInner):
+    '''eta0Internal of the geometric rainbow - its minimum over the incidence heights.'''
+    height = rainbowHeight(refractiveIndexOuter=refractiveIndexOuter, refractiveIndexInner=refractiveIndexInner)
+    return RaindropCalculations(refractiveIndexOuter=refractiveIndexOuter, refractiveIndexInner=refractiveIndexInner,
+                                incidenceHeight=height).eta0Internal
+
+def refinePeak(xs, ys, index):
+    '''Point at the vertex of the parabola through (xs, ys) at index - 1, index and index + 1 - the grid point
+        itself at the ends of the grid or if the three points don't form a maximum.'''
+    if (index <= 0) or (index >= len(xs) - 1):
+        return Point(x=float(xs[index]), y=float(ys[index]))
+    x0, x1, x2 = float(xs[index - 1]), float(xs[index]), float(xs[index + 1])
+    y0, y1, y2 = float(ys[index - 1]), float(ys[index]), float(ys[index + 1])
+    # divided differences, valid for non-uniform grids
+    slope01 = (y1 - y0) / (x1 - x0)
+    slope12 = (y2 - y1) / (x2 - x1)
+    curvature = (slope12 - slope01) / (x2 - x0)
+    if curvature >= 0:
+        return Point(x=x1, y=y1)
+    xVertex = (x0 + x1) / 2. - slope01 / (2 * curvature)
+    # Newton form of the parabola through the three points, evaluated at its vertex
+    yVertex = y0 + slope01 * (xVertex - x0) + curvature * (xVertex - x0) * (xVertex - x1)
+    return Point(x=xVertex, y=yVertex)
+
+def findPeakInFirstHalf(xs, ys):
+    '''Maximum of ys within the first half of the grid, refined between the grid points.'''
+    half = floor(len(ys) / 2)
+    index = max(range(half), key=lambda index: ys[index])
+    return refinePeak(xs=xs, ys=ys, index=index)
+
+
+
+if __name__ == '__main__':
+    from math import sqrt
+    from numpy import argmin, linspace
+    from RaindropCalculationsBatch import RaindropCalculationsBatch
+    refractiveIndexInner = 1.3347
+    height = rainbowHeight(refractiveIndexOuter=1., refractiveIndexInner=refractiveIndexInner)
+    # closed form for the primary bow - cos(alpha)^2 = (n^2 - 1) / 3
+    print('Rainbow at h = {height} [closed form off by {error:.1e}], eta0 = {angle}'.format(
+        height=height, error=height - sqrt(1 - (refractiveIndexInner ** 2 - 1) / 3.),
+        angle=rainbowAngle(refractiveIndexOuter=1., refractiveIndexInner=refractiveIndexInner)))
+    for numberOfPoints in (1001, 10001, 100001):
+        heights = linspace(-1, 1, numberOfPoints)
+        eta0s = RaindropCalculationsBatch(refractiveIndexOuter=1., refractiveIndexInner=refractiveIndexInner,
+                                          incidenceHeights=heights).eta0Internal
+        index = argmin(eta0s)
+        grid = refinePeak(xs=heights, ys=-eta0s, index=index)
+        print('{points} points: grid minimum off by {grid:.2e}°, refined off by {refined:.2e}°'.format(
+            points=numberOfPoints,
+            grid=Angle.radiansToDegrees(eta0s[index]) - rainbowAngle(1., refractiveIndexInner).degrees,
+            refined=-Angle.radiansToDegrees(grid.y) - rainbowAngle(1., refractiveIndexInner).degrees))
+    exit(0)
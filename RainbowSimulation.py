@@ -2,323 +2,146 @@
 
 '''Python script to calculate the angle a light ray is reflected
     to in a perfect sphere if it enters at an angle - assuming
-    1 internal reflection only.'''
-
-from matplotlib import pyplot as plt
-from math import floor
-from os import mkdir
-from Angle import Angle
-from FresnelCoefficients import FresnelCoefficients, Medium
-from IncidentPowerProfile import powerIncidentDensityProfile
-from Length import Length
-from LinearInterpolation import StepwiseLinearFunctionInterpolator
-from Point import Point2D as Point
-from RaindropCalculations import RaindropCalculations
-from RefractiveIndex import RefractiveIndex2007DaimonMasumura20CWater as RefractiveIndexWater
+    1 internal reflection only.
+
+    Command line entry point of the wavelength sweep [see --help]. The
+    calculation itself doesn't need matplotlib - it is only imported when
+    figures are requested, so headless batch jobs with --no-figures
+    --no-summary start without it.'''
+
+from argparse import ArgumentParser, ArgumentTypeError
+from contextlib import nullcontext
+from os import cpu_count, makedirs
+from os.path import join
+from LengthArray import LengthArray
+from RenderPool import RenderPool
+from ResultCache import ResultCache
+from ResultExport import ResultExporter, commonAngleGrid
+from SweepCheckpoint import SweepCheckpoint
+from WavelengthStream import checkpointRecords, exportRecords, renderRecords, streamWavelengths
 from numpy import linspace
 
 
-class ObjectZorder(object):
-    # bigger values are to the front
-    Raindrop = 1
-    MeetingPoints = 2
-    Lightray = 3
-
-class ObjectColor(object):
-    MeetingPoints = (0.,.8,0.)
-    Lightray = (.8,0.,0.)
-    PowerTE = (0,.5,0)
-    PowerTM = (.5,0,0)
-    PowerTETMmixed = (0,0,.5)
-
-def createFigure(calculation,
-                 directory):
-
-    # get plot
-    axis = plt.gca()
-    axis.cla()
-
-    axis.set_xlim((-1.5, 1.5))
-    axis.set_ylim((-1.5, 1.5))
-    axis.set_aspect('equal')
-
-    plt.title('Incident height = {height}, refractive indices inner / outer = {relation}'.format(
-        height=calculation.incidenceHeight,
-        relation=refractiveIndexInner / refractiveIndexOuter
-    ))
-
-    # draw sphere
-    colorValue = 2. / (1. + refractiveIndexInner / refractiveIndexOuter)
-    sphereBackgroundColor = (colorValue, colorValue, colorValue)
-
-    raindrop = plt.Circle((0, 0), 1, color=sphereBackgroundColor, fill=True, zorder=ObjectZorder.Raindrop)
-
-    axis.add_artist(raindrop)
-
-    # show light ray - incident
-    pointBeta = calculation.pointBeta
-    plt.scatter(pointBeta.x, pointBeta.y, marker='.', zorder=ObjectZorder.MeetingPoints,
-                color=ObjectColor.MeetingPoints)
-    plt.plot((2, pointBeta.x), (pointBeta.y, pointBeta.y), color=ObjectColor.Lightray)
-
-    # refracted
-    pointGamma = calculation.pointGamma
-    plt.scatter(pointGamma.x, pointGamma.y, marker='.', zorder=ObjectZorder.MeetingPoints,
-                color=ObjectColor.MeetingPoints)
-    plt.plot((pointBeta.x, pointGamma.x), (pointBeta.y, pointGamma.y), color=ObjectColor.Lightray)
-
-    # mirrored
-    pointDelta = calculation.pointDelta
-    plt.scatter(pointDelta.x, pointDelta.y, marker='.', zorder=ObjectZorder.MeetingPoints,
-                color=ObjectColor.MeetingPoints)
-    plt.plot((pointGamma.x, pointDelta.x), (pointGamma.y, pointDelta.y), color=ObjectColor.Lightray)
-
-    # emerging
-    directionEmerging = calculation.direction3
-    temp = (2. - pointDelta.x) / directionEmerging.x  # assure it goes until x = 2
-    pointEnd = pointDelta + directionEmerging * temp
-    plt.plot((pointDelta.x, pointEnd.x), (pointDelta.y, pointEnd.y), color=ObjectColor.Lightray)
-
-    # make plot visible
-    plt.savefig(fname='{directory}/result_i{indicesRelation:.2F}_h{height:.2F}.png'.format(
-        indicesRelation=(refractiveIndexInner / refractiveIndexOuter),
-        height=calculation.incidenceHeight,
-        directory=directory
-    ))
+def positiveInteger(text):
+    value = int(text)
+    if value < 1:
+        raise ArgumentTypeError('must be at least 1, not {value}'.format(value=value))
+    return value
+
+def argumentParser():
+    parser = ArgumentParser(description='Rainbow calculation over a range of wavelengths.')
+    group = parser.add_argument_group('wavelengths')
+    group.add_argument('--wavelength-min', type=float, default=380., help='shortest wavelength [nm]')
+    group.add_argument('--wavelength-max', type=float, default=740., help='longest wavelength [nm]')
+    group.add_argument('--wavelengths', type=int, default=1, help='number of wavelengths, evenly spaced')
+
+    group = parser.add_argument_group('resolution')
+    group.add_argument('--points', type=int, default=1001, help='numberOfPoints - incidence heights and exit-angle bins')
+    group.add_argument('--supersampling', type=int, default=5, help='must be greater than 1')
+    group.add_argument('--redistribution', choices=('histogram', 'surjective'), default='histogram',
+                       help='forward into exit-angle bins or inverse search')
+    group.add_argument('--density-mode', choices=('numeric', 'analytic'), default='numeric',
+                       help='supersampled or deta0/dh power density for the surjective redistribution')
+    group.add_argument('--sampling', choices=('uniform', 'adaptive'), default='uniform',
+                       help='supersampled heights or heights refined at the caustic')
+
+    group = parser.add_argument_group('output')
+    group.add_argument('--output', default='calculations3', help='directory of the figures and the checkpoint')
+    group.add_argument('--format', default='png', help='file format of the figures, e.g. png, pdf or svg')
+    group.add_argument('--no-figures', dest='figures', action='store_false',
+                       help='skip the figures per wavelength')
+    group.add_argument('--no-summary', dest='summary', action='store_false',
+                       help='skip the summary figure over the wavelengths')
+    group.add_argument('--show', action='store_true', help='show the summary figure when done')
+    group.add_argument('--export', choices=ResultExporter.Formats, default=None,
+                       help='also write the results as columnar files and memory-mapped intensity matrices '
+                            'into the export directory of the output directory')
+    group.add_argument('--export-angles', type=int, default=None,
+                       help='exit angles of the intensity matrices [default: --points]')
+
+    group = parser.add_argument_group('execution')
+    group.add_argument('--workers', type=int, default=cpu_count(), help='calculating processes, 1 calculates serially')
+    group.add_argument('--renderers', type=positiveInteger, default=max(1, cpu_count() // 4),
+                       help='background processes rendering the figures per wavelength')
+    group.add_argument('--cache', default='', help='directory of the result cache [default: cache in the output directory]')
+    group.add_argument('--no-cache', dest='cache', action='store_const', const=None,
+                       help='recalculate every wavelength')
+    group.add_argument('--cache-size', type=float, default=1024., help='size limit of the result cache [MiB]')
+    group.add_argument('--checkpoint-interval', type=float, default=30., help='seconds between checkpoints')
+    group.add_argument('--resume', action='store_true',
+                       help='skip the wavelengths completed according to the checkpoint in the output directory')
+    return parser
+
+
+def main(argumentList=None):
+    arguments = argumentParser().parse_args(argumentList)
+    if arguments.figures or arguments.summary:
+        # only now, matplotlib is a heavy import
+        from RainbowFigures import plotSummary, plotWavelengthResult
+
+    wavelengths = LengthArray(nanometers=linspace(start=arguments.wavelength_min, stop=arguments.wavelength_max,
+                                                  num=arguments.wavelengths))
+    makedirs(arguments.output, exist_ok=True)
+
+    if arguments.cache is None:
+        cache = None
+    else:
+        cache = ResultCache(directory=arguments.cache or join(arguments.output, 'cache'),
+                            maximumBytes=int(arguments.cache_size * 2**20))
+    # everything the results depend on besides the wavelengths
+    parameters = {'numberOfPoints': arguments.points, 'supersampling': arguments.supersampling,
+                  'redistribution': arguments.redistribution, 'densityMode': arguments.density_mode,
+                  'sampling': arguments.sampling}
+    checkpoint = (SweepCheckpoint.resume if arguments.resume else SweepCheckpoint)(
+        directory=arguments.output, wavelengths=wavelengths, parameters=parameters,
+        saveInterval=arguments.checkpoint_interval)
+    pendingIndices = checkpoint.pendingIndices
+
+    print('Calculating for {count} wavelengths [{done} done before].'.format(
+        count=len(wavelengths), done=len(wavelengths) - len(pendingIndices)))
+    records = streamWavelengths(wavelengths=wavelengths,
+                                numberOfPoints=arguments.points,
+                                supersampling=arguments.supersampling,
+                                redistribution=arguments.redistribution,
+                                densityMode=arguments.density_mode,
+                                sampling=arguments.sampling,
+                                numberOfWorkers=arguments.workers,
+                                cache=cache,
+                                indices=pendingIndices)
+    if arguments.export is None:
+        exporter = nullcontext()
+    else:
+        exporter = ResultExporter(directory=join(arguments.output, 'export'), wavelengths=wavelengths,
+                                  angles=commonAngleGrid(wavelengths=wavelengths,
+                                                         numberOfAngles=arguments.export_angles or arguments.points),
+                                  fileFormat=arguments.export, resume=arguments.resume)
+    # the figures are rendered in the background while the next wavelengths are calculated
+    with (RenderPool(numberOfRenderers=arguments.renderers) if arguments.figures else nullcontext()) as renderPool, \
+            exporter:
+        if renderPool is not None:
+            records = renderRecords(records, renderPool=renderPool, plotFunction=plotWavelengthResult,
+                                    directory=arguments.output, fileFormat=arguments.format)
+        if arguments.export is not None:
+            records = exportRecords(records, exporter=exporter)
+        for record in checkpointRecords(records, checkpoint=checkpoint):
+            print('\r{wavelength}'.format(wavelength=record.wavelength), end='')
+        checkpoint.save()
+    print('')
+    if cache is None:
+        print('Finished calculating.')
+    else:
+        print('Finished calculating - {hits} wavelengths from the cache.'.format(hits=cache.hits))
+
+    if arguments.summary:
+        # merged in wavelength order, including the wavelengths of a resumed sweep
+        plotSummary(wavelengthsNanometers=wavelengths.nanometers, eta0sExtrema=checkpoint.extrema(),
+                    directory=arguments.output, fileFormat=arguments.format)
+        if arguments.show:
+            from matplotlib import pyplot
+            pyplot.show()
+        print('Finished printing result.')
+    return 0
 
-    return
-
-def stepwiseLinearInterpolatorFromArrays(xList, yList):
-    listOfPoints = list()
-    for x, y in zip(xList, yList):
-        listOfPoints.append(Point(x=x, y=y))
-    return StepwiseLinearFunctionInterpolator(listOfPoints=listOfPoints)
-
-
-def transformSurjectiveRelation(oldXs, newXsOldXs, oldYsOldXsList, numberOfPoints, newXValidityCheck):
-    # use linear interpolator to reverse the relation oldXs -> newXs [which is potentially surjective!]
-    linearInterpolatorOldXsNewXs = stepwiseLinearInterpolatorFromArrays(xList=oldXs, yList=newXsOldXs)
-    linearInterpolatorsOldXsOldYs = tuple(stepwiseLinearInterpolatorFromArrays(xList=oldXs, yList=oldYsOldXs) for oldYsOldXs in oldYsOldXsList)
-
-    # determine output angles as new dependent parameter
-    newXsMin = min(newXsOldXs)
-    newXsMax = max(newXsOldXs)
-    newXs = linspace(newXsMin, newXsMax, numberOfPoints)
-
-    newYsNewXsList = tuple(list() for _ in oldYsOldXsList)  # create as many empty lists as there are lists in oldYsOldXsList
-    for newX in newXs:
-        # determine all input heights corresponding to the eta0Radians
-        correspondingOldXs = list()
-        index = -1
-        while True:
-            index += 1
-            correspondingOldX = linearInterpolatorOldXsNewXs.where(y=newX, index=index)
-            if correspondingOldX is not None and newXValidityCheck(correspondingOldX):
-                correspondingOldXs.append(correspondingOldX)
-            else:
-                break
-
-        for newYsNewXs, linearInterpolatorOldXsOldYs in zip(newYsNewXsList, linearInterpolatorsOldXsOldYs):
-            # now add up all power density from potentially different input heights saled by their respective transmittance/reflectance
-            newYNewX = 0.
-            for correspondingOldX in correspondingOldXs:
-                newY = linearInterpolatorOldXsOldYs.at(x=correspondingOldX)
-                if newY is not None:
-                    newYNewX += newY
-
-            newYsNewXs.append(newYNewX)
-
-    return newXs, newYsNewXsList
-
-def findMaxInFirstHalf(xs, ys):
-    maxY = max(ys[0:floor(len(ys) / 2)])
-    xMaxY = xs[ys.index(maxY)]
-    return Point(x=xMaxY, y=maxY)
 
 if __name__ == '__main__':
-    numberOfPoints = 1001
-    numberOfWavelengths = 1
-
-    eta0sExtrema = \
-        {'geometrical': list(),
-         'TEinternal': list(),
-         'TMinternal': list(),
-         'TeTmInternal': list(),}
-
-    # visible spectrum
-    wavelengths = tuple(Length(nanometers=value) for value in linspace(start=380, stop=740, num=numberOfWavelengths))
-
-    plotDirectory = 'calculations3'
-    try:
-        mkdir(plotDirectory)
-    except FileExistsError:
-        # directory already exists
-        pass
-
-    print('Calculating for wavelength:')
-    for wavelength in wavelengths:
-        print('\r{wavelength}'.format(wavelength=wavelength), end='')
-
-        refractiveIndexOuter = 1.
-        refractiveIndexInner = RefractiveIndexWater().refractiveIndex(wavelength=wavelength)
-
-        # scale power from dH to deta
-        supersampling = 5 # must be grater than 1
-        heightsSupersampled = linspace(-1, 1, numberOfPoints*supersampling)
-        eta0sInternalSupersampled = list()
-        powerIncidenceDensityHeight = list()
-        for height in heightsSupersampled:
-            raindropCalculations = RaindropCalculations(refractiveIndexInner=refractiveIndexInner,
-                                                        refractiveIndexOuter=refractiveIndexOuter,
-                                                        incidenceHeight=height)
-            eta0sInternalSupersampled.append(raindropCalculations.eta0Internal.radians)
-            powerIncidenceDensityHeight.append(powerIncidentDensityProfile(height))
-
-        heights = list()
-        powerIncidenceDensityEtaInternal = list()
-        dH = heightsSupersampled[1] - heightsSupersampled[0]
-        deltaH = supersampling * dH
-        for index in range(numberOfPoints):
-            tmpHeights = heightsSupersampled[index*supersampling:(index+1)*supersampling]
-            tmpPowerIncidenceDensityHeight = powerIncidenceDensityHeight[index*supersampling:(index+1)*supersampling]
-
-            integratedPower = dH * sum(tmpPowerIncidenceDensityHeight)
-
-            tmpEta0sInternal = eta0sInternalSupersampled[index*supersampling:(index+1)*supersampling]
-            deltaEtaInternal = max(tmpEta0sInternal) - min(tmpEta0sInternal)
-            powerIncidenceDensityEtaInternal.append(integratedPower/deltaEtaInternal)
-
-            heights.append(sum(tmpHeights) / supersampling)  # use average
-
-        # fig, (plt0, plt1) = plt.subplots(2,1)
-        # plot = plt0
-        # plot.plot(heightsSupersampled, eta0sInternalSupersampled)
-        # plot.plot(heightsSupersampled, powerIncidenceDensityHeight)
-        # plot = plt1
-        # plot.plot(heights, powerIncidenceDensityEtaInternal)
-        # plt.show()
-
-        del dH, deltaH, heightsSupersampled, eta0sInternalSupersampled, powerIncidenceDensityHeight, \
-            integratedPower, tmpEta0sInternal, deltaEtaInternal
-
-
-        # powers and eta0 dependent on incidence height
-        eta0sInitial = list()
-        powersTEheightsInternal= list()
-        powersTMheightsInternal= list()
-        for height in heights:
-            raindropCalculations = RaindropCalculations(refractiveIndexInner=refractiveIndexInner,
-                                                        refractiveIndexOuter=refractiveIndexOuter,
-                                                        incidenceHeight=height)
-            eta0sInitial.append(raindropCalculations.eta0Internal)
-            powersTEheightsInternal.append(raindropCalculations.transmittedPowerTransversalElectric)
-            powersTMheightsInternal.append(raindropCalculations.transmittedPowerTransversalMagnetic)
-        del raindropCalculations
-
-
-        # combine height->eta0 and power-transmittance
-        powerExcidenceDensityHeightsInternalTE = tuple(powerDensity * transmittancePercentage for powerDensity, transmittancePercentage in zip(powerIncidenceDensityEtaInternal, powersTEheightsInternal))
-        powerExcidenceDensityHeightsInternalTM = tuple(powerDensity * transmittancePercentage for powerDensity, transmittancePercentage in zip(powerIncidenceDensityEtaInternal, powersTMheightsInternal))
-
-        eta0sExcidenceRadians, (powerExcidenceDensityEta0sInternalTE, powerExcidenceDensityEta0sInternalTM) = \
-            transformSurjectiveRelation(
-                oldXs=heights,
-                newXsOldXs=tuple(eta0.radians for eta0 in eta0sInitial),
-                oldYsOldXsList=(powerExcidenceDensityHeightsInternalTE, powerExcidenceDensityHeightsInternalTM),
-                numberOfPoints=numberOfPoints,
-                newXValidityCheck=lambda x: (-1. <= x <= 1.))
-
-        # fig, (plt0, plt1) = plt.subplots(2,1)
-        # plot = plt0
-        # plot.plot(heights, powerExcidenceDensityHeightsInternalTE, label='TE-i(h)')
-        # plot.plot(heights, powerExcidenceDensityHeightsInternalTM, label='TM-i(h)')
-        # plot.set_xlabel('height')
-        # plot.set_ylabel('power excidence')
-        # plot.legend(loc='upper center')
-        # plot = plt1
-        # plot.plot(eta0sRadians, powerExcidenceDensityEta0sInternalTE, label='TE-i(eta)')
-        # plot.plot(eta0sRadians, powerExcidenceDensityEta0sInternalTM, label='TM-i(eta)')
-        # plot.set_xlabel('eta')
-        # plot.set_ylabel('power excidence')
-        # plot.legend(loc='upper center')
-        # plt.show()
-
-        # assume even mix of TE and TM polrization [non-polarized light]
-        powerExcidenceDensityEta0sInternalTETM = tuple((tmp0 + tmp1) / 2. for tmp0, tmp1 in zip(powerExcidenceDensityEta0sInternalTE, powerExcidenceDensityEta0sInternalTM))
-        powersTETMheightsInternal = tuple((tmp0 + tmp1) / 2. for tmp0, tmp1 in zip(powersTEheightsInternal, powersTMheightsInternal))
-
-        # plot all relations
-        figure, (axis0, axis1, axis2) = plt.subplots(3, 1)
-
-        figure.suptitle('Refractive indices inner / outer = {relation}'.format(
-            relation=refractiveIndexInner / refractiveIndexOuter
-        ))
-
-        axis = axis0
-        eta0sInitialDegree = tuple(eta0.degrees for eta0 in eta0sInitial)
-        axis.plot(heights, eta0sInitialDegree, color=ObjectColor.Lightray)
-        axis.set_xlabel('height [nu]')  # normalize unit
-        axis.set_ylabel('eta0 [°]')
-
-        axis = axis1
-        axis.plot(heights, powersTEheightsInternal, color=ObjectColor.PowerTE, label='TE-i')
-        axis.plot(heights, powersTMheightsInternal, color=ObjectColor.PowerTM, label='TM-i')
-        axis.plot(heights, powersTETMheightsInternal, color=ObjectColor.PowerTETMmixed, label='(TE-i+TM-i)/2')
-        axis.set_xlabel('height [nu]')  # normalize unit
-        axis.set_ylabel('transmitted power [nu]')
-        legend1 = axis.legend(loc='upper center')
-
-        axis = axis2
-        eta0sExcidenceDegree = tuple(Angle.radiansToDegrees(angle) for angle in eta0sExcidenceRadians)
-        axis.plot(eta0sExcidenceDegree, powerExcidenceDensityEta0sInternalTE, color=ObjectColor.PowerTE, label='TE-i')
-        axis.plot(eta0sExcidenceDegree, powerExcidenceDensityEta0sInternalTM, color=ObjectColor.PowerTM, label='TM-i')
-        axis.plot(eta0sExcidenceDegree, powerExcidenceDensityEta0sInternalTETM, color=ObjectColor.PowerTETMmixed, label='(TE-i+TM-i)/2')
-        axis.set_xlabel('eta0 [°]')
-        axis.set_ylabel('transmitted power [nu]')  # normalize unit
-        legend4 = axis.legend(loc='upper right')
-
-        plt.savefig(fname='{directory}/results_{wavelength:.2F}.png'.format(
-            wavelength=wavelength.nanometers,
-            directory=plotDirectory
-        ), dpi=300)
-        plt.close(figure)
-        # plt.show()
-
-        # geometric local extremum of eta0 relative to incidence height
-        eta0sExtrema['geometrical'].append(Point(x=min(eta0sInitial), y=None))
-        temp = findMaxInFirstHalf(xs=eta0sExcidenceRadians, ys=powerExcidenceDensityEta0sInternalTE)
-        eta0sExtrema['TEinternal'].append(Point(x=Angle(radians=temp.x), y=temp.y))
-        temp = findMaxInFirstHalf(xs=eta0sExcidenceRadians, ys=powerExcidenceDensityEta0sInternalTM)
-        eta0sExtrema['TMinternal'].append(Point(x=Angle(radians=temp.x), y=temp.y))
-        temp = findMaxInFirstHalf(xs=eta0sExcidenceRadians, ys=powerExcidenceDensityEta0sInternalTETM)
-        eta0sExtrema['TeTmInternal'].append(Point(x=Angle(radians=temp.x), y=temp.y))
-        del temp
-
-    print('\nFinished calculating.')
-
-    fig, (plt0, plt1) = plt.subplots(1, 2)
-    plt.title('Maximum excidence angle depending on wavelength for water.')
-    curPlot = plt0
-    curPlot.set_xlabel('wavelength [nm]')
-    curPlot.set_ylabel('eta0 [°]')
-    wavelengthsNm = tuple(wavlength.nanometers for wavlength in wavelengths)
-    for key, value in eta0sExtrema.items():
-        curPlot.plot(wavelengthsNm, tuple(maximum.x.degrees for maximum in value), label=key)
-    curPlot.legend(loc='upper right')
-
-    curPlot = plt1
-    curPlot.set_xlabel('wavelength [nm]')
-    curPlot.set_ylabel('maximum power density [a.u.]')
-    for key, value in eta0sExtrema.items():
-        curPlot.plot(wavelengthsNm, tuple(maximum.y for maximum in value), label=key)
-    curPlot.legend(loc='upper right')
-
-
-    plt.savefig(fname='{directory}/results_overall.png'.format(
-        directory=plotDirectory
-    ), dpi=300)
-    plt.show()
-
-    print('Finished printing result.')
-
-    exit(0)
+    exit(main())
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+
+'''Vectorized counterpart of RaindropCalculations - evaluates a whole array
+    of incidence heights at once. All angles are returned as numpy arrays in
+    radians instead of Angle objects.'''
+
+from numpy import arcsin, asarray, errstate, full_like, pi, sqrt, stack, zeros_like
+from AngleArray import AngleArray
+from FresnelCoefficients import FresnelCoefficients, Medium
+from RotationArray import Rotate2DArray
+from UnitCircleHelpers import unitCirclePointsFromAngles
+from VectorArray import Vector2DArray
+
+
+class RaindropCalculationsBatch(object):
+
+    def __init__(self, refractiveIndexOuter, refractiveIndexInner, incidenceHeights):
+        self.refractiveIndexOuter = refractiveIndexOuter
+        self.refractiveIndexInner = refractiveIndexInner
+        self.incidenceHeights = asarray(incidenceHeights, dtype=float)
+        self.mediumInner = Medium(refractiveIndex=self.refractiveIndexInner, magneticPermeability=1.)
+        self.mediumOuter = Medium(refractiveIndex=self.refractiveIndexOuter, magneticPermeability=1.)
+        self.fresnelIn = FresnelCoefficients(mediumFrom=self.mediumOuter, mediumTo=self.mediumInner)
+        self.fresnelOut = FresnelCoefficients(mediumFrom=self.mediumInner, mediumTo=self.mediumOuter)
+        # the only two angles everything else is derived from
+        self._alpha0 = arcsin(self.incidenceHeights)
+        self._beta1 = self.fresnelIn.getTransmissionAngleArray(incidenceAngles=self._alpha0)
+        return
+
+    def __len__(self):
+        return self.incidenceHeights.size
+
+    @property
+    def n0(self):
+        return self.refractiveIndexOuter
+
+    @property
+    def n1(self):
+        return self.refractiveIndexInner
+
+    @property
+    def h0(self):
+        return self.incidenceHeights
+
+    @property
+    def alpha0(self):
+        return self._alpha0
+
+    @property
+    def direction0(self):
+        return Vector2DArray(x=full_like(self.incidenceHeights, -1.), y=zeros_like(self.incidenceHeights))
+
+    # beta
+    @property
+    def pointBeta(self):
+        '''Incidence.'''
+        return unitCirclePointsFromAngles(AngleArray(radians=self.alpha0))
+
+    @property
+    def beta0(self):
+        return self._alpha0
+
+    @property
+    def beta1(self):
+        return self._beta1
+
+    @property
+    def epsilon0(self):
+        return self.beta0 - self.beta1
+
+    @property
+    def direction1(self):
+        return Rotate2DArray(angles=AngleArray(radians=self.epsilon0)) * self.direction0
+
+    # gamma
+    @property
+    def pointGamma(self):
+        '''Reflection.'''
+        return unitCirclePointsFromAngles(AngleArray(radians=self.gamma))
+
+    @property
+    def gamma(self):
+        return pi + self.beta0 - self.beta1 * 2
+
+    @property
+    def gamma1(self):
+        return self.beta1
+
+    @property
+    def direction2(self):
+        return Rotate2DArray(angles=AngleArray(radians=(pi - self.gamma1 * 2))) * self.direction1
+
+    # delta
+    @property
+    def pointDelta(self):
+        '''Emergence.'''
+        return unitCirclePointsFromAngles(AngleArray(radians=self.delta))
+
+    @property
+    def delta(self):
+        return self.gamma + pi - self.beta1 * 2
+
+    @property
+    def delta0(self):
+        return self.beta0
+
+    @property
+    def delta1(self):
+        return self.beta1
+
+    @property
+    def direction3(self):
+        return Rotate2DArray(angles=AngleArray(radians=(self.delta0 - self.delta1))) * self.direction2
+
+    def rayPaths(self, xStart=2., xEnd=2.):
+        '''Vertices of every ray - incident from x = xStart, through beta, gamma and delta, emerging up to
+            x = xEnd. Shape (rays, 5, 2), e.g. for the segments of a matplotlib LineCollection.'''
+        pointBeta = self.pointBeta
+        pointDelta = self.pointDelta
+        direction3 = self.direction3
+        with errstate(divide='ignore'):
+            pointEnd = pointDelta + direction3 * ((xEnd - pointDelta.x) / direction3.x)
+        pointStart = pointBeta.xy.copy()
+        pointStart[0] = xStart
+        return stack((pointStart, pointBeta.xy, self.pointGamma.xy, pointDelta.xy, pointEnd.xy)).transpose(2, 0, 1)
+
+    @property
+    def eta0Internal(self):
+        return -2 * (2 * self.beta1 - self.beta0)
+
+    @property
+    def deta0InternaldH(self):
+        relation = self.refractiveIndexOuter / self.refractiveIndexInner
+        with errstate(divide='ignore'):
+            return -2 * (2 / sqrt(1 - (relation * self.incidenceHeights) ** 2) * relation -
+                         1. / sqrt(1 - self.incidenceHeights ** 2))
+
+    @property
+    def eta0External(self):
+        return self.beta0 * 2.
+
+    @property
+    def deta0ExternaldH(self):
+        with errstate(divide='ignore'):
+            return 2. / sqrt(1 - self.incidenceHeights ** 2)
+
+    @property
+    def transmittedPowerTransversalElectric(self):
+        return self.fresnelIn.transmittanceTransversalElectricArray(incidenceAngles=self.beta0) * \
+               self.fresnelOut.reflectanceTransversalElectricArray(incidenceAngles=self.beta1) * \
+               self.fresnelOut.transmittanceTransversalElectricArray(incidenceAngles=self.beta1)
+
+    @property
+    def transmittedPowerTransversalMagnetic(self):
+        return self.fresnelIn.transmittanceTransversalMagneticArray(incidenceAngles=self.beta0) * \
+               self.fresnelOut.reflectanceTransversalMagneticArray(incidenceAngles=self.beta1) * \
+               self.fresnelOut.transmittanceTransversalMagneticArray(incidenceAngles=self.beta1)
+
+    @property
+    def reflectedPowerTransversalElectric(self):
+        return self.fresnelIn.reflectanceTransversalElectricArray(incidenceAngles=self.beta0)
+
+    @property
+    def reflectedPowerTransversalMagnetic(self):
+        return self.fresnelIn.reflectanceTransversalMagneticArray(incidenceAngles=self.beta0)
+
+
+
+if __name__ == '__main__':
+    from numpy import linspace
+    from RaindropCalculations import RaindropCalculations
+    heights = linspace(-.99, .99, 9)
+    batch = RaindropCalculationsBatch(refractiveIndexOuter=1., refractiveIndexInner=1.3347, incidenceHeights=heights)
+    for index, height in enumerate(heights):
+        single = RaindropCalculations(refractiveIndexOuter=1., refractiveIndexInner=1.3347, incidenceHeight=height)
+        print(height,
+              single.eta0Internal.radians - batch.eta0Internal[index],
+              single.transmittedPowerTransversalElectric - batch.transmittedPowerTransversalElectric[index],
+              single.transmittedPowerTransversalMagnetic - batch.transmittedPowerTransversalMagnetic[index],
+              abs(single.pointDelta.x - batch.pointDelta.x[index]) + abs(single.direction3.y - batch.direction3.y[index]))
+    exit(0)
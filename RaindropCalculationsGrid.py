@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+'''Raindrop calculations over a whole (wavelength, height) grid at once.
+
+    The refractive index is evaluated once per wavelength and broadcast as a
+    column against the row of incidence heights, so every quantity comes out
+    as a (wavelength, height) array. The grid is processed in chunks of
+    wavelengths to keep the temporaries bounded.'''
+
+from numpy import asarray, empty
+from LengthArray import LengthArray
+from RaindropCalculationsBatch import RaindropCalculationsBatch
+from RefractiveIndex import RefractiveIndex2007DaimonMasumura20CWater as RefractiveIndexWater
+
+
+class RaindropCalculationsGrid(object):
+
+    Quantities = ('eta0Internal', 'transmittedPowerTransversalElectric', 'transmittedPowerTransversalMagnetic')
+
+    def __init__(self, wavelengths, incidenceHeights, refractiveIndexOuter=1., refractiveIndexModel=None):
+        if refractiveIndexModel is None:
+            refractiveIndexModel = RefractiveIndexWater()
+        if not isinstance(wavelengths, LengthArray):
+            wavelengths = LengthArray.fromLengths(wavelengths)
+        self.wavelengths = wavelengths
+        self.incidenceHeights = asarray(incidenceHeights, dtype=float)
+        self.refractiveIndexOuter = refractiveIndexOuter
+        self.refractiveIndexModel = refractiveIndexModel
+        self.refractiveIndicesInner = refractiveIndexModel.refractiveIndices(wavelengths=self.wavelengths)
+        return
+
+    @property
+    def shape(self):
+        return (len(self.wavelengths), len(self.incidenceHeights))
+
+    def batch(self, start=0, stop=None):
+        '''RaindropCalculationsBatch for the wavelengths [start, stop) - its properties are (wavelength, height) arrays.'''
+        return RaindropCalculationsBatch(refractiveIndexOuter=self.refractiveIndexOuter,
+                                         refractiveIndexInner=self.refractiveIndicesInner[start:stop, None],
+                                         incidenceHeights=self.incidenceHeights)
+
+    def iterateChunks(self, chunkSize):
+        '''Yield (start, stop, batch) for consecutive chunks of at most chunkSize wavelengths.'''
+        for start in range(0, len(self.wavelengths), chunkSize):
+            stop = min(start + chunkSize, len(self.wavelengths))
+            yield start, stop, self.batch(start=start, stop=stop)
+        return
+
+    def calculate(self, chunkSize=None, quantities=Quantities, out=None):
+        '''C-contiguous (wavelength, height) arrays for each of the quantities [any RaindropCalculationsBatch
+            property], filled chunk by chunk. Preallocated arrays [e.g. memory-mapped] may be passed in out,
+            a dictionary by quantity.'''
+        if chunkSize is None:
+            chunkSize = len(self.wavelengths)
+        if out is None:
+            out = dict()
+        for quantity in quantities:
+            if quantity not in out:
+                out[quantity] = empty(self.shape)
+        for start, stop, batch in self.iterateChunks(chunkSize=chunkSize):
+            for quantity in quantities:
+                out[quantity][start:stop] = getattr(batch, quantity)
+        return out
+
+
+
+if __name__ == '__main__':
+    from time import perf_counter
+    from numpy import linspace
+    wavelengths = LengthArray(nanometers=linspace(start=380, stop=740, num=361))
+    heights = linspace(-1, 1, 5005)
+
+    start = perf_counter()
+    grid = RaindropCalculationsGrid(wavelengths=wavelengths, incidenceHeights=heights)
+    results = grid.calculate(chunkSize=32)
+    print('Grid of {shape}: {seconds:.3f}s'.format(shape=grid.shape, seconds=perf_counter() - start))
+
+    start = perf_counter()
+    for index, wavelength in enumerate(wavelengths):
+        batch = RaindropCalculationsBatch(refractiveIndexOuter=1.,
+                                          refractiveIndexInner=RefractiveIndexWater().refractiveIndex(wavelength=wavelength),
+                                          incidenceHeights=heights)
+        for quantity in RaindropCalculationsGrid.Quantities:
+            assert (abs(getattr(batch, quantity) - results[quantity][index]) < 1e-12).all()
+    print('Per wavelength:  {seconds:.3f}s'.format(seconds=perf_counter() - start))
+    exit(0)
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+'''Raindrop calculations for the orders 1..K of internal reflections in one pass.
+
+    A ray with k internal reflections is refracted into the drop, rotated by
+    pi - 2 * beta1 at every reflection and refracted out again, so
+
+        eta_k     = 2 * (beta0 - beta1) + k * (pi - 2 * beta1) - pi
+        deta_k/dh = 2 / sqrt(1 - h^2) - 2 * (k + 1) * n0 / n1 / sqrt(1 - (n0 / n1 * h)^2)
+        power_k   = T_in(beta0) * R_out(beta1)^k * T_out(beta1)
+
+    for TE and TM each. Order 1 is the primary bow of RaindropCalculationsBatch.
+    Everything is evaluated from the shared beta0/beta1 and Fresnel terms; the
+    results carry the order as a leading axis of length K. Angles are not
+    wrapped, so that they stay continuous in the height - see wrapAngles.'''
+
+from numpy import arange, errstate, mod, pi, sqrt
+from RaindropCalculationsBatch import RaindropCalculationsBatch
+
+
+def wrapAngles(angles):
+    '''Angles in radians mapped to [-pi, pi).'''
+    return mod(angles + pi, 2 * pi) - pi
+
+
+class RaindropCalculationsMultiOrder(RaindropCalculationsBatch):
+
+    def __init__(self, refractiveIndexOuter, refractiveIndexInner, incidenceHeights, maximumOrder):
+        if maximumOrder < 1:
+            raise ValueError('The maximum order must be at least 1, got {maximumOrder}.'.format(maximumOrder=maximumOrder))
+        RaindropCalculationsBatch.__init__(self, refractiveIndexOuter=refractiveIndexOuter,
+                                           refractiveIndexInner=refractiveIndexInner,
+                                           incidenceHeights=incidenceHeights)
+        self.maximumOrder = maximumOrder
+        return
+
+    @property
+    def orders(self):
+        return arange(1, self.maximumOrder + 1)
+
+    def _ordersAxis(self):
+        # orders as a leading axis, broadcasting against the heights
+        return self.orders.reshape((self.maximumOrder,) + (1,) * self.incidenceHeights.ndim)
+
+    @property
+    def eta0InternalOrders(self):
+        return 2 * (self.beta0 - self.beta1) + self._ordersAxis() * (pi - 2 * self.beta1) - pi
+
+    @property
+    def deta0InternaldHOrders(self):
+        relation = self.refractiveIndexOuter / self.refractiveIndexInner
+        with errstate(divide='ignore'):
+            return 2. / sqrt(1 - self.incidenceHeights ** 2) - \
+                   2 * (self._ordersAxis() + 1) * relation / sqrt(1 - (relation * self.incidenceHeights) ** 2)
+
+    def _transmittedPowerOrders(self, transmittanceIn, reflectanceOut, transmittanceOut):
+        # every further reflection only multiplies by the same internal reflectance
+        return (transmittanceIn * transmittanceOut) * reflectanceOut ** self._ordersAxis()
+
+    @property
+    def transmittedPowerTransversalElectricOrders(self):
+        return self._transmittedPowerOrders(
+            transmittanceIn=self.fresnelIn.transmittanceTransversalElectricArray(incidenceAngles=self.beta0),
+            reflectanceOut=self.fresnelOut.reflectanceTransversalElectricArray(incidenceAngles=self.beta1),
+            transmittanceOut=self.fresnelOut.transmittanceTransversalElectricArray(incidenceAngles=self.beta1))
+
+    @property
+    def transmittedPowerTransversalMagneticOrders(self):
+        return self._transmittedPowerOrders(
+            transmittanceIn=self.fresnelIn.transmittanceTransversalMagneticArray(incidenceAngles=self.beta0),
+            reflectanceOut=self.fresnelOut.reflectanceTransversalMagneticArray(incidenceAngles=self.beta1),
+            transmittanceOut=self.fresnelOut.transmittanceTransversalMagneticArray(incidenceAngles=self.beta1))
+
+
+
+if __name__ == '__main__':
+    from numpy import argmin, linspace
+    from Angle import Angle
+    heights = linspace(0, .9999, 100001)
+    calculations = RaindropCalculationsMultiOrder(refractiveIndexOuter=1., refractiveIndexInner=1.3347,
+                                                  incidenceHeights=heights, maximumOrder=4)
+    primary = RaindropCalculationsBatch(refractiveIndexOuter=1., refractiveIndexInner=1.3347, incidenceHeights=heights)
+    print('Order 1 vs. RaindropCalculationsBatch: {eta:.1e} {deta:.1e} {te:.1e} {tm:.1e}'.format(
+        eta=abs(calculations.eta0InternalOrders[0] - primary.eta0Internal).max(),
+        deta=abs(calculations.deta0InternaldHOrders[0] - primary.deta0InternaldH).max(),
+        te=abs(calculations.transmittedPowerTransversalElectricOrders[0] - primary.transmittedPowerTransversalElectric).max(),
+        tm=abs(calculations.transmittedPowerTransversalMagneticOrders[0] - primary.transmittedPowerTransversalMagnetic).max()))
+    # the bow of each order is where eta is stationary
+    for order, eta0s, deta0sdH, powers in zip(calculations.orders, wrapAngles(calculations.eta0InternalOrders),
+                                              calculations.deta0InternaldHOrders,
+                                              calculations.transmittedPowerTransversalElectricOrders):
+        index = argmin(abs(deta0sdH))
+        print('Order {order}: bow at h = {height:.4f}, eta = {eta:.2f}°, TE power {power:.4f}'.format(
+            order=order, height=heights[index], eta=Angle.radiansToDegrees(eta0s[index]), power=powers[index]))
+    exit(0)
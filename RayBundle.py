@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+
+'''Struct-of-arrays container for many rays through a raindrop.
+
+    All fields live in one C-contiguous float64 array of shape
+    (fields, rays) - every field is a contiguous row, handed out as a view
+    without copying. A ray thus takes len(Fields) * 8 bytes instead of
+    several hundred bytes of Angle and Point objects. Angles are stored in
+    radians; degrees are derived on access.'''
+
+from numpy import ascontiguousarray, concatenate, empty
+from Angle import Angle
+
+
+class RayBundle(object):
+
+    Fields = ('heights',
+              'alpha0', 'beta1', 'eta0Internal',  # entry, internal and exit angle
+              'pointBetaX', 'pointBetaY', 'pointGammaX', 'pointGammaY', 'pointDeltaX', 'pointDeltaY',
+              'powersTE', 'powersTM')
+    AngleFields = ('alpha0', 'beta1', 'eta0Internal')
+
+    _FieldIndices = {field: index for index, field in enumerate(Fields)}
+
+    def __init__(self, data):
+        '''data is an array of shape (len(Fields), rays) - it is used as is if already C-contiguous float64.'''
+        data = ascontiguousarray(data, dtype=float)
+        if (data.ndim != 2) or (data.shape[0] != len(self.Fields)):
+            raise ValueError('RayBundle data must have shape ({fields}, rays) but has {shape}.'.format(
+                fields=len(self.Fields), shape=data.shape))
+        self._data = data
+        return
+
+    @classmethod
+    def empty(cls, numberOfRays):
+        return cls(data=empty((len(cls.Fields), numberOfRays)))
+
+    @classmethod
+    def fromRaindropCalculations(cls, raindropCalculations):
+        '''From a one dimensional RaindropCalculationsBatch.'''
+        bundle = cls.empty(numberOfRays=len(raindropCalculations))
+        bundle.heights[:] = raindropCalculations.h0
+        bundle.alpha0[:] = raindropCalculations.alpha0
+        bundle.beta1[:] = raindropCalculations.beta1
+        bundle.eta0Internal[:] = raindropCalculations.eta0Internal
+        bundle.pointsBeta[:] = raindropCalculations.pointBeta.xy
+        bundle.pointsGamma[:] = raindropCalculations.pointGamma.xy
+        bundle.pointsDelta[:] = raindropCalculations.pointDelta.xy
+        bundle.powersTE[:] = raindropCalculations.transmittedPowerTransversalElectric
+        bundle.powersTM[:] = raindropCalculations.transmittedPowerTransversalMagnetic
+        return bundle
+
+    @classmethod
+    def concatenate(cls, bundles):
+        return cls(data=concatenate(tuple(bundle.data for bundle in bundles), axis=1))
+
+    def __len__(self):
+        return self._data.shape[1]
+
+    def __getitem__(self, key):
+        '''Sub-bundle of the selected rays - a view for slices, a copy for index arrays and masks.'''
+        return RayBundle(data=self._data[:, key])
+
+    @property
+    def data(self):
+        return self._data
+
+    @property
+    def nbytes(self):
+        return self._data.nbytes
+
+    @property
+    def bytesPerRay(self):
+        return self._data.itemsize * self._data.shape[0]
+
+    def field(self, name):
+        '''View of one field, in radians for angles.'''
+        return self._data[self._FieldIndices[name]]
+
+    def degrees(self, name):
+        if name not in self.AngleFields:
+            raise ValueError('{name} is not an angle.'.format(name=name))
+        return Angle.radiansToDegrees(self.field(name))
+
+    @property
+    def heights(self):
+        return self.field('heights')
+
+    @property
+    def alpha0(self):
+        return self.field('alpha0')
+
+    @property
+    def beta1(self):
+        return self.field('beta1')
+
+    @property
+    def eta0Internal(self):
+        return self.field('eta0Internal')
+
+    @property
+    def pointsBeta(self):
+        '''Incidence - (x, y) view of shape (2, rays).'''
+        index = self._FieldIndices['pointBetaX']
+        return self._data[index:index + 2]
+
+    @property
+    def pointsGamma(self):
+        '''Reflection - (x, y) view of shape (2, rays).'''
+        index = self._FieldIndices['pointGammaX']
+        return self._data[index:index + 2]
+
+    @property
+    def pointsDelta(self):
+        '''Emergence - (x, y) view of shape (2, rays).'''
+        index = self._FieldIndices['pointDeltaX']
+        return self._data[index:index + 2]
+
+    @property
+    def powersTE(self):
+        return self.field('powersTE')
+
+    @property
+    def powersTM(self):
+        return self.field('powersTM')
+
+    @property
+    def powersTETM(self):
+        # assume even mix of TE and TM polrization [non-polarized light]
+        return (self.powersTE + self.powersTM) / 2.
+
+
+
+if __name__ == '__main__':
+    from numpy import linspace
+    from RaindropCalculations import RaindropCalculations
+    from RaindropCalculationsBatch import RaindropCalculationsBatch
+    heights = linspace(-.99, .99, 9)
+    bundle = RayBundle.fromRaindropCalculations(RaindropCalculationsBatch(refractiveIndexOuter=1., refractiveIndexInner=1.3347,
+                                                                          incidenceHeights=heights))
+    for index, height in enumerate(heights):
+        single = RaindropCalculations(refractiveIndexOuter=1., refractiveIndexInner=1.3347, incidenceHeight=height)
+        print(height,
+              single.eta0Internal.degrees - bundle.degrees('eta0Internal')[index],
+              single.pointGamma.x - bundle.pointsGamma[0, index], single.pointDelta.y - bundle.pointsDelta[1, index],
+              single.transmittedPowerTransversalElectric - bundle.powersTE[index])
+    print('{bytes} bytes per ray'.format(bytes=bundle.bytesPerRay))
+    exit(0)
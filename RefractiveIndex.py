@@ -1,8 +1,11 @@
 # -*- coding: utf-8 -*-
 
+from functools import lru_cache
 from math import sqrt
+from numpy import asarray, sqrt as sqrtArray
 from Range import Range
 from Length import Length
+from MetricPrefixes import MetricPrefix
 
 class RefractiveIndex(object):
 
@@ -17,6 +20,33 @@ class RefractiveIndex(object):
         temp = sqrt(temp2)
         return temp
 
+    def permittivityArray(self, wavelengthsMeters):
+        # generic fallback, child-classes should override this with a vectorized version
+        wavelengthsMeters = asarray(wavelengthsMeters, dtype=float)
+        return asarray(tuple(self.permittivity(wavelength=Length(meters=value)) for value in wavelengthsMeters.ravel()),
+                       dtype=float).reshape(wavelengthsMeters.shape)
+
+    def refractiveIndexArray(self, wavelengthsMeters):
+        return sqrtArray(self.permittivityArray(wavelengthsMeters=wavelengthsMeters))
+
+    def permittivities(self, wavelengths):
+        '''For a LengthArray - missing wavelengths give NaN.'''
+        return self.permittivityArray(wavelengthsMeters=wavelengths.meters)
+
+    def refractiveIndices(self, wavelengths):
+        '''For a LengthArray - missing wavelengths give NaN.'''
+        return self.refractiveIndexArray(wavelengthsMeters=wavelengths.meters)
+
+
+@lru_cache(maxsize=4096)
+def _sellmeierPermittivity(sellmeierCoefficientPairs, wavelengthMicrometers):
+    # module level so that the cache is shared by all instances and survives pickling them
+    wavelengthSquaredMicrometers = wavelengthMicrometers ** 2
+    permittivity = 1
+    for sellmeierCoefficientPair in sellmeierCoefficientPairs:
+        permittivity += sellmeierCoefficientPair[0] / (1 - (sellmeierCoefficientPair[1] / wavelengthSquaredMicrometers))
+    return permittivity
+
 
 class RefractiveIndexSellmeier(RefractiveIndex):
 
@@ -24,17 +54,30 @@ class RefractiveIndexSellmeier(RefractiveIndex):
         # Sellmeier coefficient pair in (1, micrometers^2)
         RefractiveIndex.__init__(self)
         self.wavelengthRange = wavelengthRange
-        self.sellmeierCoefficientPairs = sellmeierCoefficientPairs
+        # tuples, so that they can be part of the cache key
+        self.sellmeierCoefficientPairs = tuple(tuple(pair) for pair in sellmeierCoefficientPairs)
+        # plain floats, comparing Lengths is comparatively slow
+        self._wavelengthRangeMeters = Range(min=wavelengthRange.min.meters, max=wavelengthRange.max.meters)
         return
 
     def permittivity(self, wavelength):
-        if not self.wavelengthRange.checkValueInRange(value=wavelength):
+        if not self._wavelengthRangeMeters.checkValueInRange(value=wavelength.meters):
             raise ValueError('Wavlength [{wavelength}] out of range [{range}].'.format(wavelength=wavelength,
                                                                                        range=self.wavelengthRange))
-        wavelengthSquaredMicrometers = wavelength.micrometers ** 2
+        # repeated look-ups of the same wavelength are served from a bounded LRU cache
+        return _sellmeierPermittivity(self.sellmeierCoefficientPairs, wavelength.meters / MetricPrefix.Micro)
+
+    def permittivityArray(self, wavelengthsMeters):
+        wavelengthsMeters = asarray(wavelengthsMeters, dtype=float)
+        # missing [NaN] wavelengths are passed through
+        outOfRange = (wavelengthsMeters > self._wavelengthRangeMeters.max) | (wavelengthsMeters < self._wavelengthRangeMeters.min)
+        if outOfRange.any():
+            raise ValueError('Wavlength [{wavelength}] out of range [{range}].'.format(wavelength=Length(meters=float(wavelengthsMeters[outOfRange][0])),
+                                                                                       range=self.wavelengthRange))
+        wavelengthSquaredMicrometers = (wavelengthsMeters / MetricPrefix.Micro) ** 2
         permittivity = 1
         for sellmeierCoefficientPair in self.sellmeierCoefficientPairs:
-            permittivity += sellmeierCoefficientPair[0] / (1 - (sellmeierCoefficientPair[1] / wavelengthSquaredMicrometers))
+            permittivity = permittivity + sellmeierCoefficientPair[0] / (1 - (sellmeierCoefficientPair[1] / wavelengthSquaredMicrometers))
         return permittivity
 
 
@@ -56,10 +99,9 @@ class RefractiveIndex2007DaimonMasumura20CWater(RefractiveIndexSellmeier):
 
 if __name__ == '__main__':
     from Length import Length
-    from matplotlib import pyplot as plt
-    wavelengths = tuple(Length(nanometers=value) for value in range(180, 1130, 5))
-    refractiveIndexWater = tuple(RefractiveIndex2007DaimonMasumura20CWater().refractiveIndex(wavelength=wavelength) for wavelength in wavelengths)
-    wavelengthsNanometer = tuple(wavelength.nanometers for wavelength in wavelengths)
-    plt.plot(wavelengthsNanometer, refractiveIndexWater)
-    plt.show()
+    # plotted over the whole range by RainbowFigures.plotRefractiveIndex
+    refractiveIndexWater = RefractiveIndex2007DaimonMasumura20CWater()
+    for nanometers in (200, 380, 560, 740, 1120):
+        print('{wavelength} nm: {refractiveIndex:.6f}'.format(
+            wavelength=nanometers, refractiveIndex=refractiveIndexWater.refractiveIndex(wavelength=Length(nanometers=nanometers))))
     exit(0)
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+'''Rendering figures in background processes, decoupled from the calculation.
+
+    Render tasks - a picklable function and its keyword arguments, e.g. a
+    module level plot function and a WavelengthResult - go through a bounded
+    queue to renderer processes using the non-interactive Agg backend. When
+    the renderers fall behind, submit blocks once the queue is full, so
+    finished results can't pile up in memory. matplotlib is only imported
+    in the renderer processes.'''
+
+from multiprocessing import get_context
+from queue import Full
+
+
+def _renderTasks(tasks):
+    from matplotlib import pyplot
+    pyplot.switch_backend('Agg')
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        function, arguments = task
+        function(**arguments)
+    return
+
+
+class RenderPool(object):
+
+    def __init__(self, numberOfRenderers=1, maximumQueueSize=None, startMethod=None):
+        '''maximumQueueSize defaults to two tasks per renderer, startMethod to the platform's default.'''
+        if numberOfRenderers < 1:
+            raise ValueError('A RenderPool needs at least one renderer.')
+        if maximumQueueSize is None:
+            maximumQueueSize = 2 * numberOfRenderers
+        elif maximumQueueSize < 1:
+            # a queue of size 0 would be unbounded
+            raise ValueError('The queue must hold at least one task.')
+        context = get_context(startMethod)
+        self._tasks = context.Queue(maxsize=maximumQueueSize)
+        self._renderers = tuple(context.Process(target=_renderTasks, args=(self._tasks,), daemon=True)
+                                for _ in range(numberOfRenderers))
+        for renderer in self._renderers:
+            renderer.start()
+        return
+
+    def _checkRenderers(self):
+        for renderer in self._renderers:
+            if renderer.exitcode not in (None, 0):
+                raise RuntimeError('A renderer process failed with exit code {exitcode}.'.format(exitcode=renderer.exitcode))
+        return
+
+    def _put(self, task):
+        # blocks while the queue is full, but notices failed renderers instead of waiting forever
+        while True:
+            try:
+                self._tasks.put(task, timeout=1.)
+                return
+            except Full:
+                self._checkRenderers()
+
+    def submit(self, function, **arguments):
+        '''Render function(**arguments) in one of the renderer processes.'''
+        self._put((function, arguments))
+        return
+
+    def close(self):
+        '''Wait until all submitted tasks are rendered.'''
+        for _ in self._renderers:
+            self._put(None)
+        for renderer in self._renderers:
+            renderer.join()
+        self._checkRenderers()
+        return
+
+    def terminate(self):
+        for renderer in self._renderers:
+            renderer.terminate()
+            renderer.join()
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exceptionType, exceptionValue, traceback):
+        if exceptionType is None:
+            self.close()
+        else:
+            # don't wait for the rest of the figures
+            self.terminate()
+        return False
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+
+'''Content-addressed on-disk cache for per-wavelength results.
+
+    An entry's key is the SHA-256 of its calculation parameters [as
+    canonical JSON] together with the hash of the source of the modules the
+    calculation runs through [found by following the imports of
+    WavelengthSweep], so changing any of them simply misses instead
+    of serving stale results. Entries are NPZ files of named arrays carrying
+    the SHA-256 of their own content; an entry failing that check [or not
+    readable at all] counts as a miss and is removed. Files are written to a
+    temporary name and renamed, so an interrupted write never leaves a
+    partial entry. The file modification time records the last use: once
+    the directory grows beyond maximumBytes, the least recently used entries
+    are evicted.'''
+
+from functools import lru_cache
+from hashlib import sha256
+from importlib.util import find_spec
+from json import dumps
+from modulefinder import ModuleFinder
+from os import listdir, makedirs, remove, replace, stat, utime
+from os.path import basename, dirname, exists, join
+from tempfile import NamedTemporaryFile
+from zipfile import BadZipFile
+from numpy import ascontiguousarray, asarray, frombuffer, load, savez, uint8
+
+
+@lru_cache(maxsize=None)
+def moduleSourceFiles(moduleName='WavelengthSweep'):
+    '''Source files of the module and of all modules of its directory it imports, directly or indirectly - the
+        imports are followed statically, so the result doesn't depend on what else the process imported.'''
+    origin = find_spec(moduleName).origin
+    # only searching the module's directory skips numpy and the standard library
+    finder = ModuleFinder(path=[dirname(origin)])
+    finder.run_script(origin)
+    return tuple(sorted(module.__file__ for module in finder.modules.values() if module.__file__ is not None))
+
+@lru_cache(maxsize=None)
+def sourceFingerprint(moduleName='WavelengthSweep'):
+    '''SHA-256 over the moduleSourceFiles of the module - changes to the plotting don't invalidate the cache.'''
+    digest = sha256()
+    for fileName in moduleSourceFiles(moduleName):
+        digest.update(basename(fileName).encode())
+        with open(fileName, 'rb') as sourceFile:
+            digest.update(sourceFile.read())
+    return digest.hexdigest()
+
+def arrayFingerprint(array):
+    array = ascontiguousarray(array)
+    digest = sha256('{dtype}{shape}'.format(dtype=array.dtype.str, shape=array.shape).encode())
+    digest.update(array.data)
+    return digest.hexdigest()
+
+def _arraysChecksum(arrays):
+    digest = sha256()
+    for name in sorted(arrays):
+        digest.update(name.encode())
+        digest.update(arrayFingerprint(arrays[name]).encode())
+    return digest.digest()
+
+
+class ResultCache(object):
+
+    Suffix = '.npz'
+    _ChecksumName = '_checksum'
+
+    def __init__(self, directory, maximumBytes=2**30, codeVersion=None):
+        '''codeVersion defaults to the sourceFingerprint of WavelengthSweep.'''
+        makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.maximumBytes = maximumBytes
+        self.codeVersion = sourceFingerprint() if codeVersion is None else codeVersion
+        # entries served by load, and results stored after they had to be calculated
+        self.hits = 0
+        self.misses = 0
+        return
+
+    def key(self, parameters):
+        '''Hex key of the parameters - a dictionary of JSON serializable values.'''
+        return sha256(dumps({'parameters': parameters, 'codeVersion': self.codeVersion},
+                            sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+
+    def _path(self, key):
+        return join(self.directory, key + self.Suffix)
+
+    def contains(self, key):
+        '''Whether an entry for key exists - without checking its integrity [load does].'''
+        return exists(self._path(key))
+
+    def load(self, key):
+        '''The named arrays stored for key, or None.'''
+        path = self._path(key)
+        try:
+            with load(path, allow_pickle=False) as entry:
+                arrays = {name: entry[name] for name in entry.files}
+            checksum = arrays.pop(self._ChecksumName).tobytes()
+            valid = (checksum == _arraysChecksum(arrays))
+        except FileNotFoundError:
+            return None
+        except (BadZipFile, EOFError, KeyError, OSError, ValueError):
+            valid = False
+        if not valid:
+            # corrupt entries are dropped and recalculated
+            self._remove(path)
+            return None
+        # mark as recently used
+        utime(path)
+        self.hits += 1
+        return arrays
+
+    def store(self, key, arrays):
+        '''Add the named arrays for key - every stored result had to be calculated, so it counts as a miss.'''
+        arrays = {name: asarray(value) for name, value in arrays.items()}
+        if self._ChecksumName in arrays:
+            raise ValueError('{name} is reserved.'.format(name=self._ChecksumName))
+        checksum = frombuffer(_arraysChecksum(arrays), dtype=uint8)
+        with NamedTemporaryFile(dir=self.directory, suffix='.tmp', delete=False) as temporaryFile:
+            savez(temporaryFile, **arrays, **{self._ChecksumName: checksum})
+        replace(temporaryFile.name, self._path(key))
+        self.misses += 1
+        self.evict(keep=key)
+        return
+
+    def _entries(self):
+        # (last use, size, path) of all entries
+        entries = list()
+        for fileName in listdir(self.directory):
+            if fileName.endswith(self.Suffix):
+                path = join(self.directory, fileName)
+                try:
+                    status = stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((status.st_mtime, status.st_size, path))
+        return entries
+
+    @property
+    def nbytes(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self, keep=None):
+        '''Remove the least recently used entries until at most maximumBytes are used - except the entry of keep.'''
+        entries = sorted(self._entries())
+        totalBytes = sum(size for _, size, _ in entries)
+        keepPath = None if keep is None else self._path(keep)
+        for _, size, path in entries:
+            if totalBytes <= self.maximumBytes:
+                break
+            if path != keepPath:
+                self._remove(path)
+                totalBytes -= size
+        return
+
+    @staticmethod
+    def _remove(path):
+        try:
+            remove(path)
+        except FileNotFoundError:
+            pass
+        return
+
+    def clear(self):
+        for _, _, path in self._entries():
+            self._remove(path)
+        return
+
+
+
+if __name__ == '__main__':
+    from tempfile import TemporaryDirectory
+    from numpy import arange, array_equal
+    with TemporaryDirectory() as directory:
+        cache = ResultCache(directory=directory, maximumBytes=3000)
+        keys = tuple(cache.key({'index': index}) for index in range(4))
+        for index, key in enumerate(keys):
+            cache.store(key, {'values': arange(100.) * index})
+        print('Stored 4 entries, kept {entries} within {bytes} bytes.'.format(entries=len(cache._entries()),
+                                                                             bytes=cache.maximumBytes))
+        print('Newest entry intact: {intact}'.format(intact=array_equal(cache.load(keys[-1])['values'], arange(100.) * 3)))
+        # corrupt the newest entry
+        with open(cache._path(keys[-1]), 'r+b') as entryFile:
+            entryFile.seek(200)
+            entryFile.write(b'\xff' * 8)
+        print('Corrupt entry served: {served}, hits {hits}, misses {misses}'.format(
+            served=cache.load(keys[-1]) is not None, hits=cache.hits, misses=cache.misses))
+    exit(0)
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+'''Export of per-wavelength results for analysis without recalculating.
+
+    Every wavelength is written as soon as it is added, as columnar files -
+    one table over the incidence heights [height, eta0, TE/TM/mixed power]
+    and one over the exit angles [eta0, TE/TM/mixed power density], either
+    as NPZ of named columns or as CSV. The files are named by the
+    wavelength's index in the sweep [like the rows of the matrices below]
+    and hold the exact wavelength - in NPZ as wavelengthMeters, in CSV in
+    a first comment line. The power densities of all
+    wavelengths are also rebinned onto a common exit-angle grid and
+    written into one (wavelengths, angles) matrix per channel, preallocated
+    as memory-mapped .npy files: readers can open them with
+    numpy.load(..., mmap_mode='r') and only page in what they access, and
+    the writer only holds one row at a time. Rows of wavelengths not
+    added yet are NaN. Angles are in radians.'''
+
+from os import makedirs
+from os.path import exists, join
+from numpy import asarray, column_stack, linspace, nan, nanmax, nanmin, savetxt, savez
+from numpy.lib.format import open_memmap
+from PowerRedistribution import rebinPowerDensities
+from RainbowLocator import rainbowAngle
+from RefractiveIndex import RefractiveIndex2007DaimonMasumura20CWater as RefractiveIndexWater
+
+
+def commonAngleGrid(wavelengths, numberOfAngles, refractiveIndexOuter=1.):
+    '''Exit angles covering every wavelength's range - eta0Internal is odd in the height, so its range is
+        symmetric around 0 and bounded by the rainbow angle, which is monotonic in the refractive index.'''
+    refractiveIndices = RefractiveIndexWater().refractiveIndices(wavelengths=wavelengths)
+    maximum = max(abs(rainbowAngle(refractiveIndexOuter=refractiveIndexOuter, refractiveIndexInner=float(refractiveIndexInner)).radians)
+                  for refractiveIndexInner in (nanmin(refractiveIndices), nanmax(refractiveIndices)))
+    return linspace(-maximum, maximum, numberOfAngles)
+
+
+class ResultExporter(object):
+
+    Formats = ('npz', 'csv')
+    Channels = ('TE', 'TM', 'TETM')
+    HeightColumns = ('heights', 'eta0Internal', 'powersTE', 'powersTM', 'powersTETM')
+    AngleColumns = ('eta0sExcidence', 'powerExcidenceDensityTE', 'powerExcidenceDensityTM', 'powerExcidenceDensityTETM')
+
+    def __init__(self, directory, wavelengths, angles, fileFormat='npz', resume=False):
+        '''wavelengths is a LengthArray, angles the common exit-angle grid of the intensity matrices [radians].
+            With resume, existing matrices of the same shape are continued instead of overwritten.'''
+        if fileFormat not in self.Formats:
+            raise ValueError('Unknown export format [{fileFormat}].'.format(fileFormat=fileFormat))
+        makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.fileFormat = fileFormat
+        self.wavelengthsMeters = asarray(wavelengths.meters, dtype=float)
+        self.angles = asarray(angles, dtype=float)
+        shape = (len(self.wavelengthsMeters), len(self.angles))
+        self.intensities = dict()
+        for channel in self.Channels:
+            path = join(directory, 'intensity{channel}.npy'.format(channel=channel))
+            if resume and exists(path):
+                intensities = open_memmap(path, mode='r+')
+                if intensities.shape != shape:
+                    raise ValueError('{path} has shape {stored} instead of {shape}.'.format(path=path, stored=intensities.shape,
+                                                                                            shape=shape))
+            else:
+                intensities = open_memmap(path, mode='w+', dtype=float, shape=shape)
+                intensities[:] = nan
+            self.intensities[channel] = intensities
+        # the axes of the matrices
+        savez(join(directory, 'axes.npz'), wavelengthsMeters=self.wavelengthsMeters, angles=self.angles)
+        return
+
+    def _fileStem(self, index):
+        # by index - wavelengths closer than any rounding of them would share names
+        return join(self.directory, 'wavelength_{index:05d}'.format(index=index))
+
+    def add(self, index, result):
+        '''Write the result of the wavelength at index.'''
+        heightColumns = (result.heights, result.eta0sInternal, result.powersTEheightsInternal,
+                         result.powersTMheightsInternal, result.powersTETMheightsInternal)
+        angleColumns = tuple(getattr(result, name) for name in self.AngleColumns)
+        wavelengthMeters = result.wavelength.meters
+        stem = self._fileStem(index)
+        if self.fileFormat == 'npz':
+            savez(stem + '_heights.npz', wavelengthMeters=wavelengthMeters, **dict(zip(self.HeightColumns, heightColumns)))
+            savez(stem + '_angles.npz', wavelengthMeters=wavelengthMeters, **dict(zip(self.AngleColumns, angleColumns)))
+        else:
+            for fileName, names, columns in ((stem + '_heights.csv', self.HeightColumns, heightColumns),
+                                             (stem + '_angles.csv', self.AngleColumns, angleColumns)):
+                savetxt(fileName, column_stack(columns), delimiter=',', comments='',
+                        header='# wavelengthMeters={wavelength!r}\n{names}'.format(wavelength=wavelengthMeters,
+                                                                                    names=','.join(names)))
+
+        # resampled conserving the power [a caustic narrower than the grid spacing keeps its power]
+        for channel, powerDensities in zip(self.Channels, angleColumns[1:]):
+            self.intensities[channel][index] = rebinPowerDensities(binCenters=result.eta0sExcidence,
+                                                                   powerDensities=powerDensities,
+                                                                   newBinCenters=self.angles)
+        return
+
+    def flush(self):
+        for intensities in self.intensities.values():
+            intensities.flush()
+        return
+
+    def close(self):
+        self.flush()
+        self.intensities = dict()
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exceptionType, exceptionValue, traceback):
+        self.close()
+        return False
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+'''Class for rotating many Vector2Ds at once - one rotation per vector.'''
+
+from numpy import cos, sin
+
+from Angle import Angle
+from AngleArray import AngleArray
+from TypeHelpers import TypeChecker
+from Vector import Vector2D
+from VectorArray import Vector2DArray
+
+class Rotate2DArray(TypeChecker):
+
+    def __init__(self, angles):
+        TypeChecker.__init__(self)
+        self.checkType((AngleArray, Angle), angles, 'An AngleArray must be supplied for the rotations')
+        self.angles = angles if isinstance(angles, AngleArray) else AngleArray(radians=angles.radians)
+        # calculated once, not for every multiplication
+        self._cos = cos(self.angles.radians)
+        self._sin = sin(self.angles.radians)
+        return
+
+    def __len__(self):
+        return len(self.angles)
+
+    def __str__(self):
+        return '{angles}'.format(angles=self.angles)
+
+    def __repr__(self):
+        return '{value} - Rotate2DArray at {address}'.format(value=str(self), address = hex(id(self)))
+
+    def __mul__(self, other):
+        if isinstance(other, Rotate2DArray):
+            return Rotate2DArray(angles=(self.angles + other.angles))
+        self.checkType((Vector2DArray, Vector2D), other, 'Rotate2DArray can only multiply Vector2Ds')
+        return Vector2DArray(x=(self._cos * other.x - self._sin * other.y),
+                             y=(self._sin * other.x + self._cos * other.y))
+
+    def __neg__(self):
+        return Rotate2DArray(angles=-self.angles)
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+'''Checkpoint of a wavelength sweep, so that an interrupted sweep can be resumed.
+
+    The checkpoint keeps what the summary of a sweep needs from every
+    completed wavelength - its extrema and its redistributed power densities
+    per exit angle - in one compact NPZ file, together with the wavelengths
+    and parameters of the sweep. It is written at most every saveInterval
+    seconds [and on save()], to a temporary file which then replaces the
+    previous checkpoint, so a crash while writing leaves the last complete
+    checkpoint behind.'''
+
+from json import dumps
+from os import makedirs, replace
+from os.path import exists, join
+from tempfile import NamedTemporaryFile
+from time import monotonic
+from numpy import array_equal, asarray, flatnonzero, full, isnan, load, nan, savez, zeros
+from Angle import Angle
+from Point import Point2D as Point
+from WavelengthSweep import WavelengthResult
+
+
+class SweepCheckpoint(object):
+
+    FileName = 'checkpoint.npz'
+    SpectraNames = ('eta0sExcidence', 'powerExcidenceDensityTE', 'powerExcidenceDensityTM', 'powerExcidenceDensityTETM')
+
+    def __init__(self, directory, wavelengths, parameters, saveInterval=30.):
+        '''wavelengths is a LengthArray, parameters a dictionary of JSON serializable values describing the sweep.'''
+        makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.path = join(directory, self.FileName)
+        self.wavelengthsMeters = asarray(wavelengths.meters, dtype=float)
+        self.parameters = dumps(parameters, sort_keys=True)
+        self.saveInterval = saveInterval
+        self.completed = zeros(len(self.wavelengthsMeters), dtype=bool)
+        # one row per extrema key and column per wavelength, NaN for None
+        self.extremaX = full((len(WavelengthResult.ExtremaKeys), len(self.wavelengthsMeters)), nan)
+        self.extremaY = full((len(WavelengthResult.ExtremaKeys), len(self.wavelengthsMeters)), nan)
+        # one row per wavelength, allocated with the first result
+        self.spectra = None
+        self._lastSave = monotonic()
+        return
+
+    @classmethod
+    def resume(cls, directory, wavelengths, parameters, saveInterval=30.):
+        '''The checkpoint in directory, or a new one if there is none. Raises a ValueError if it belongs to a sweep
+            of other wavelengths or parameters.'''
+        checkpoint = cls(directory=directory, wavelengths=wavelengths, parameters=parameters, saveInterval=saveInterval)
+        if not exists(checkpoint.path):
+            return checkpoint
+        with load(checkpoint.path, allow_pickle=False) as stored:
+            if (str(stored['parameters']) != checkpoint.parameters) or \
+                    not array_equal(stored['wavelengthsMeters'], checkpoint.wavelengthsMeters):
+                raise ValueError('The checkpoint {path} belongs to a different sweep.'.format(path=checkpoint.path))
+            checkpoint.completed = stored['completed']
+            checkpoint.extremaX = stored['extremaX']
+            checkpoint.extremaY = stored['extremaY']
+            if checkpoint.completed.any():
+                checkpoint.spectra = {name: stored[name] for name in cls.SpectraNames}
+        return checkpoint
+
+    @property
+    def pendingIndices(self):
+        '''Indices of the wavelengths not completed yet.'''
+        return flatnonzero(~self.completed)
+
+    def add(self, index, result, extrema=None):
+        '''Record the result of the wavelength at index - saved once saveInterval has passed since the last save.
+            extrema are the result's, if they are calculated already.'''
+        # a property calculating all extrema at once
+        if extrema is None:
+            extrema = result.extrema
+        for row, key in enumerate(WavelengthResult.ExtremaKeys):
+            extremum = extrema[key]
+            self.extremaX[row, index] = extremum.x.radians
+            self.extremaY[row, index] = nan if extremum.y is None else extremum.y
+        if self.spectra is None:
+            self.spectra = {name: full((len(self.wavelengthsMeters), len(getattr(result, name))), nan)
+                            for name in self.SpectraNames}
+        for name in self.SpectraNames:
+            self.spectra[name][index] = getattr(result, name)
+        self.completed[index] = True
+        if monotonic() - self._lastSave >= self.saveInterval:
+            self.save()
+        return
+
+    def save(self):
+        spectra = dict() if self.spectra is None else self.spectra
+        with NamedTemporaryFile(dir=self.directory, suffix='.tmp', delete=False) as temporaryFile:
+            savez(temporaryFile, parameters=asarray(self.parameters), wavelengthsMeters=self.wavelengthsMeters,
+                  completed=self.completed, extremaX=self.extremaX, extremaY=self.extremaY, **spectra)
+        replace(temporaryFile.name, self.path)
+        self._lastSave = monotonic()
+        return
+
+    def extrema(self):
+        '''Extrema of the completed wavelengths, one list per key in the order of the wavelengths - as collectExtrema.'''
+        eta0sExtrema = dict()
+        for row, key in enumerate(WavelengthResult.ExtremaKeys):
+            eta0sExtrema[key] = list(Point(x=Angle(radians=float(x)), y=(None if isnan(y) else float(y)))
+                                     for x, y in zip(self.extremaX[row, self.completed], self.extremaY[row, self.completed]))
+        return eta0sExtrema
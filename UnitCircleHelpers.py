@@ -1,9 +1,12 @@
 # -*- coding: utf-8 -*-
 
-from math import atan, cos, sin
+from math import atan2, cos, pi, sin
+from numpy import arctan2, cos as cosArray, mod, sin as sinArray
 
 from Angle import Angle
+from AngleArray import AngleArray
 from Point import Point2D
+from PointArray import Point2DArray
 
 def unitCirclePointFromAngle(angle):
     return Point2D(x=cos(angle.radians), y=sin(angle.radians))
@@ -15,10 +18,21 @@ def otherIntersectionOf(pointFrom, direction):
                    y=(pointFrom.y - direction.y * tempVal))
 
 def angleFromPointOnUnitCircle(point):
-    angle = Angle(radians=atan(point.y / point.x))
-    if point.x < 0:
-        angle += Angle(degrees=180.)
-    else:
-        if point.y < 0:
-            angle += Angle(degrees=360)
-    return angle
\ No newline at end of file
+    # in [0, 360°)
+    return Angle(radians=(atan2(point.y, point.x) % (2 * pi)))
+
+
+# array counterparts - one numpy pass for all points
+
+def unitCirclePointsFromAngles(angles):
+    return Point2DArray(x=cosArray(angles.radians), y=sinArray(angles.radians))
+
+def otherIntersectionsOf(pointsFrom, directions):
+    '''pointsFrom must lie on the unit cirecle and directions must be normalized.'''
+    tempVals = 2 * (pointsFrom.x * directions.x + pointsFrom.y * directions.y)
+    return Point2DArray(x=(pointsFrom.x - directions.x * tempVals),
+                        y=(pointsFrom.y - directions.y * tempVals))
+
+def anglesFromPointsOnUnitCircle(points):
+    # in [0, 360°)
+    return AngleArray(radians=mod(arctan2(points.y, points.x), 2 * pi))
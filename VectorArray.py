@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+'''Class for storing many 2D vectors in one numpy array.'''
+
+from numpy import asarray, broadcast_arrays, hypot, stack
+from TypeHelpers import TypeChecker
+from Vector import Vector2D
+
+class Vector2DArray(TypeChecker):
+
+    def __init__(self, x, y):
+        TypeChecker.__init__(self)
+        # x and y are the rows of one array of shape (2, ...)
+        self.xy = stack(broadcast_arrays(asarray(x, dtype=float), asarray(y, dtype=float)))
+        return
+
+    @classmethod
+    def fromXY(cls, xy):
+        '''From an array of shape (2, ...) - no copy.'''
+        vectors = cls.__new__(cls)
+        TypeChecker.__init__(vectors)
+        vectors.xy = asarray(xy, dtype=float)
+        return vectors
+
+    @property
+    def x(self):
+        return self.xy[0]
+
+    @property
+    def y(self):
+        return self.xy[1]
+
+    def __len__(self):
+        return self.xy.shape[1]
+
+    def __getitem__(self, key):
+        xy = self.xy[:, key]
+        if xy.ndim == 1:
+            return Vector2D(x=float(xy[0]), y=float(xy[1]))
+        return Vector2DArray.fromXY(xy)
+
+    def __str__(self):
+        return '({x}, {y})'.format(x=self.x, y = self.y)
+
+    def __repr__(self):
+        return '{value} - Vector2DArray at {address}'.format(value=str(self), address = hex(id(self)))
+
+    def __add__(self, other):
+        # Vector2Ds broadcast against Vector2DArrays
+        self.checkType((Vector2DArray, Vector2D), other, 'Only Vectors can be added to Vectors')
+        return Vector2DArray(x=(self.x + other.x), y=(self.y + other.y))
+
+    def __sub__(self, other):
+        return self.__add__(-other)
+
+    def __mul__(self, other):
+        # scalars or one scalar per vector
+        if isinstance(other, (Vector2DArray, Vector2D)):
+            raise TypeError('Incompatible type supplied [{type}]: Vectors can only be multiplied by scalars.'.format(type=type(other)))
+        return Vector2DArray.fromXY(self.xy * asarray(other, dtype=float))
+
+    def __rmul__(self, other):
+        return self * other
+
+    def __truediv__(self, other):
+        return self.__mul__(1. / asarray(other, dtype=float))
+
+    def __neg__(self):
+        return Vector2DArray.fromXY(-self.xy)
+
+    def __abs__(self):
+        return hypot(self.x, self.y)
+
+    def dot(self, other):
+        return self.x * other.x + self.y * other.y
+
+    # numpy arrays and scalars defer to the reflected operators above
+    __array_ufunc__ = None
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+'''Streaming API - one record per wavelength, yielded as soon as it is calculated.
+
+    streamWavelengths is the source of an iterator pipeline: it runs on
+    iterateWavelengths [process pool and result cache included] and yields
+    a WavelengthRecord per wavelength, in the order of the wavelengths. The
+    stages below pass every record on after handing it to a consumer - the
+    background renderer, the exporter or the checkpoint - so they compose
+    as plain generators:
+
+        records = streamWavelengths(wavelengths, numberOfPoints=1001, supersampling=5, cache=cache)
+        records = exportRecords(records, exporter=exporter)
+        for record in records:
+            ...
+
+    Only the records in flight are held, so memory stays at about one
+    wavelength's worth of data [plus what the pool calculates ahead], and a
+    consumer may stop at any time - closing the pipeline cancels the
+    remaining calculations.'''
+
+from numpy import arange, asarray
+from WavelengthSweep import iterateWavelengths
+
+
+class WavelengthRecord(object):
+    '''One wavelength of a stream - its index within the sweep's wavelengths, the refractive index, the spectra
+        over the exit angle [radians] and the peaks, as well as the full WavelengthResult.'''
+
+    __slots__ = ('index', 'result', '_extrema')
+
+    def __init__(self, index, result):
+        self.index = index
+        self.result = result
+        self._extrema = None
+        return
+
+    @property
+    def wavelength(self):
+        return self.result.wavelength
+
+    @property
+    def refractiveIndexInner(self):
+        return self.result.refractiveIndexInner
+
+    @property
+    def refractiveIndexOuter(self):
+        return self.result.refractiveIndexOuter
+
+    @property
+    def eta0sExcidence(self):
+        return self.result.eta0sExcidence
+
+    @property
+    def powerExcidenceDensityTE(self):
+        return self.result.powerExcidenceDensityTE
+
+    @property
+    def powerExcidenceDensityTM(self):
+        return self.result.powerExcidenceDensityTM
+
+    @property
+    def powerExcidenceDensityTETM(self):
+        return self.result.powerExcidenceDensityTETM
+
+    @property
+    def peaks(self):
+        '''Geometric rainbow and power density maxima - as WavelengthResult.extrema, calculated once.'''
+        if self._extrema is None:
+            self._extrema = self.result.extrema
+        return self._extrema
+
+
+def streamWavelengths(wavelengths, numberOfPoints, supersampling, redistribution='histogram', densityMode='numeric',
+                      sampling='uniform', numberOfWorkers=1, incidentPowerProfile=None, cache=None, indices=None):
+    '''WavelengthRecords of the wavelengths [a LengthArray] - only of those at indices if given, e.g. the ones
+        a resumed sweep still misses.'''
+    indices = arange(len(wavelengths)) if indices is None else asarray(indices, dtype=int)
+    results = iterateWavelengths(wavelengths=wavelengths[indices], numberOfPoints=numberOfPoints,
+                                 supersampling=supersampling, redistribution=redistribution, densityMode=densityMode,
+                                 sampling=sampling, numberOfWorkers=numberOfWorkers,
+                                 incidentPowerProfile=incidentPowerProfile, cache=cache)
+    try:
+        for index, result in zip(indices, results):
+            yield WavelengthRecord(index=int(index), result=result)
+    finally:
+        # stops the pool if the consumer stopped early
+        results.close()
+    return
+
+def renderRecords(records, renderPool, plotFunction, **arguments):
+    '''Submit plotFunction(result=..., **arguments) of every record to a RenderPool.'''
+    for record in records:
+        renderPool.submit(plotFunction, result=record.result, **arguments)
+        yield record
+    return
+
+def exportRecords(records, exporter):
+    '''Write every record with a ResultExporter.'''
+    for record in records:
+        exporter.add(index=record.index, result=record.result)
+        yield record
+    return
+
+def checkpointRecords(records, checkpoint):
+    '''Add every record to a SweepCheckpoint.'''
+    for record in records:
+        checkpoint.add(index=record.index, result=record.result, extrema=record.peaks)
+        yield record
+    return
+
+
+
+if __name__ == '__main__':
+    from numpy import linspace
+    from Angle import Angle
+    from LengthArray import LengthArray
+    wavelengths = LengthArray(nanometers=linspace(380, 740, 37))
+    # consumers may stop early - here at the first wavelength whose rainbow angle exceeds 41.5°
+    for record in streamWavelengths(wavelengths=wavelengths, numberOfPoints=1001, supersampling=5, numberOfWorkers=2):
+        rainbow = Angle.radiansToDegrees(abs(record.peaks['geometrical'].x.radians))
+        print('{wavelength:.0f} nm: n = {refractiveIndex:.5f}, rainbow at {rainbow:.3f}°'.format(
+            wavelength=record.wavelength.nanometers, refractiveIndex=record.refractiveIndexInner, rainbow=rainbow))
+        if rainbow > 41.5:
+            break
+    exit(0)
@@ -0,0 +1,407 @@
+# -*- coding: utf-8 -*-
+
+'''Per-wavelength rainbow calculation and the sweep over many wavelengths.
+
+    calculateWavelength is a module level function so that it can be pickled
+    and run in worker processes.'''
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+from os import cpu_count
+from Angle import Angle
+from AdaptiveSampling import adaptiveHeights
+from IncidentPowerProfile import UniformIncidentPowerProfile
+from Length import Length
+from LinearInterpolation import StepwiseLinearFunctionInterpolator
+from Point import Point2D as Point
+from PowerRedistribution import redistributePowerDensity
+from RainbowLocator import findPeakInFirstHalf, rainbowAngle
+from RaindropCalculationsBatch import RaindropCalculationsBatch
+from RayBundle import RayBundle
+from RefractiveIndex import RefractiveIndex2007DaimonMasumura20CWater as RefractiveIndexWater
+from ResultCache import arrayFingerprint
+from numpy import asarray, errstate, isfinite, isnan, linspace, logical_and, nan, nansum, where
+
+
+def stepwiseLinearInterpolatorFromArrays(xList, yList):
+    return StepwiseLinearFunctionInterpolator.fromArrays(xValues=xList, yValues=yList)
+
+
+def transformSurjectiveRelation(oldXs, newXsOldXs, oldYsOldXsList, numberOfPoints, newXValidityCheck):
+    # use linear interpolator to reverse the relation oldXs -> newXs [which is potentially surjective!]
+    linearInterpolatorOldXsNewXs = stepwiseLinearInterpolatorFromArrays(xList=oldXs, yList=newXsOldXs)
+    linearInterpolatorsOldXsOldYs = tuple(stepwiseLinearInterpolatorFromArrays(xList=oldXs, yList=oldYsOldXs) for oldYsOldXs in oldYsOldXsList)
+
+    # determine output angles as new dependent parameter
+    newXsMin = min(newXsOldXs)
+    newXsMax = max(newXsOldXs)
+    newXs = linspace(newXsMin, newXsMax, numberOfPoints)
+
+    # determine all input heights corresponding to the eta0Radians - one column per monotone branch,
+    # at an extremum both adjacent branches contribute [as in the limit from either side]
+    correspondingOldXs = linearInterpolatorOldXsNewXs.whereAllArray(ys=newXs, uniqueSharedPoints=False)
+    isRoot = ~isnan(correspondingOldXs)
+    isValid = isRoot.copy()
+    isValid[isRoot] = tuple(bool(newXValidityCheck(correspondingOldX)) for correspondingOldX in correspondingOldXs[isRoot])
+    # as before, a root is only used if all roots before it passed the validity check
+    isUsed = logical_and.accumulate(isValid | ~isRoot, axis=1) & isRoot
+
+    newYsNewXsList = list()
+    for linearInterpolatorOldXsOldYs in linearInterpolatorsOldXsOldYs:
+        # now add up all power density from potentially different input heights saled by their respective transmittance/reflectance
+        newYs = linearInterpolatorOldXsOldYs.atArray(xs=where(isUsed, correspondingOldXs, nan))
+        newYsNewXsList.append(nansum(newYs, axis=1).tolist())
+    newYsNewXsList = tuple(newYsNewXsList)
+
+    return newXs, newYsNewXsList
+
+class WavelengthResult(object):
+    '''Everything calculated for one wavelength - angles in radians.'''
+
+    ExtremaKeys = ('geometrical', 'TEinternal', 'TMinternal', 'TeTmInternal')
+
+    def __init__(self, wavelength, refractiveIndexInner, refractiveIndexOuter, rays,
+                 eta0sExcidence, powerExcidenceDensityTE, powerExcidenceDensityTM, powerExcidenceDensityTETM):
+        self.wavelength = wavelength
+        self.refractiveIndexInner = refractiveIndexInner
+        self.refractiveIndexOuter = refractiveIndexOuter
+        # dependent on incidence height
+        self.rays = rays
+        # dependent on excidence angle
+        self.eta0sExcidence = asarray(eta0sExcidence, dtype=float)
+        self.powerExcidenceDensityTE = asarray(powerExcidenceDensityTE, dtype=float)
+        self.powerExcidenceDensityTM = asarray(powerExcidenceDensityTM, dtype=float)
+        self.powerExcidenceDensityTETM = asarray(powerExcidenceDensityTETM, dtype=float)
+        return
+
+    def toArrays(self):
+        '''Everything as named arrays, e.g. for storing - see fromArrays.'''
+        return {'wavelengthMeters': asarray(self.wavelength.meters, dtype=float),
+                'refractiveIndexInner': asarray(self.refractiveIndexInner, dtype=float),
+                'refractiveIndexOuter': asarray(self.refractiveIndexOuter, dtype=float),
+                'rays': self.rays.data,
+                'eta0sExcidence': self.eta0sExcidence,
+                'powerExcidenceDensityTE': self.powerExcidenceDensityTE,
+                'powerExcidenceDensityTM': self.powerExcidenceDensityTM,
+                'powerExcidenceDensityTETM': self.powerExcidenceDensityTETM}
+
+    @classmethod
+    def fromArrays(cls, arrays):
+        return cls(wavelength=Length(meters=float(arrays['wavelengthMeters'])),
+                   refractiveIndexInner=float(arrays['refractiveIndexInner']),
+                   refractiveIndexOuter=float(arrays['refractiveIndexOuter']),
+                   rays=RayBundle(data=arrays['rays']),
+                   eta0sExcidence=arrays['eta0sExcidence'],
+                   powerExcidenceDensityTE=arrays['powerExcidenceDensityTE'],
+                   powerExcidenceDensityTM=arrays['powerExcidenceDensityTM'],
+                   powerExcidenceDensityTETM=arrays['powerExcidenceDensityTETM'])
+
+    @property
+    def heights(self):
+        return self.rays.heights
+
+    @property
+    def eta0sInternal(self):
+        return self.rays.eta0Internal
+
+    @property
+    def powersTEheightsInternal(self):
+        return self.rays.powersTE
+
+    @property
+    def powersTMheightsInternal(self):
+        return self.rays.powersTM
+
+    @property
+    def powersTETMheightsInternal(self):
+        return self.rays.powersTETM
+
+    @property
+    def extrema(self):
+        # geometric local extremum of eta0 relative to incidence height [root of deta0InternaldH, independent
+        # of the grid] and maximum power densities [refined between the grid points]
+        extrema = {'geometrical': Point(x=rainbowAngle(refractiveIndexOuter=self.refractiveIndexOuter,
+                                                       refractiveIndexInner=self.refractiveIndexInner), y=None)}
+        for key, powerExcidenceDensity in (('TEinternal', self.powerExcidenceDensityTE),
+                                           ('TMinternal', self.powerExcidenceDensityTM),
+                                           ('TeTmInternal', self.powerExcidenceDensityTETM)):
+            temp = findPeakInFirstHalf(xs=self.eta0sExcidence, ys=powerExcidenceDensity)
+            extrema[key] = Point(x=Angle(radians=temp.x), y=temp.y)
+        return extrema
+
+
+def powerIncidenceDensityEtaNumeric(heightsSupersampled, eta0sInternalSupersampled, powerIncidenceDensityHeight,
+                                    numberOfPoints, supersampling):
+    '''Power density per internal angle at the chunk averaged heights - power summed over every chunk of
+        supersampling heights, divided by the spread of the chunk's angles.'''
+    dH = heightsSupersampled[1] - heightsSupersampled[0]
+    # one row per chunk
+    integratedPowers = dH * asarray(powerIncidenceDensityHeight, dtype=float).reshape(numberOfPoints, supersampling).sum(axis=1)
+    eta0sInternalChunks = asarray(eta0sInternalSupersampled).reshape(numberOfPoints, supersampling)
+    deltaEtasInternal = eta0sInternalChunks.max(axis=1) - eta0sInternalChunks.min(axis=1)
+    with errstate(divide='ignore', invalid='ignore'):
+        return integratedPowers / deltaEtasInternal
+
+def powerIncidenceDensityEtaAnalytic(raindropCalculations, powerIncidenceDensityHeight):
+    '''Power density per internal angle from the analytic Jacobian - p(h) / |deta0/dh|.'''
+    with errstate(divide='ignore'):
+        return asarray(powerIncidenceDensityHeight, dtype=float) / abs(raindropCalculations.deta0InternaldH)
+
+
+def calculateWavelength(wavelength, numberOfPoints, supersampling, redistribution='histogram', densityMode='numeric',
+                        refractiveIndexOuter=1., sampling='uniform', adaptiveTolerance=1e-7, incidentPowerProfile=None):
+    '''supersampling must be greater than 1, redistribution is either 'histogram' [forward into
+        exit-angle bins] or 'surjective' [inverse search]. For the latter densityMode selects how the
+        power density per angle is determined - either 'numeric' from the supersampled heights, or
+        'analytic' from deta0InternaldH, which skips the supersampled raindrop calculations.
+
+        sampling 'adaptive' replaces the uniform supersampled heights by heights refined where power would
+        be misplaced by more than adaptiveTolerance [see AdaptiveSampling.adaptiveHeights] - the per height
+        results are then given at these heights and supersampling is not used. It needs the histogram
+        redistribution or the analytic density.
+
+        incidentPowerProfile is an IncidentPowerProfile, by default the uniform beam.'''
+    if densityMode not in ('numeric', 'analytic'):
+        raise ValueError('Unknown density mode [{densityMode}].'.format(densityMode=densityMode))
+    if sampling not in ('uniform', 'adaptive'):
+        raise ValueError('Unknown sampling [{sampling}].'.format(sampling=sampling))
+    if (sampling == 'adaptive') and (redistribution == 'surjective') and (densityMode == 'numeric'):
+        raise ValueError('The numeric density needs uniform sampling.')
+    if incidentPowerProfile is None:
+        incidentPowerProfile = UniformIncidentPowerProfile()
+    refractiveIndexInner = RefractiveIndexWater().refractiveIndex(wavelength=wavelength)
+
+    def raindropCalculationsFromHeights(heights):
+        return RaindropCalculationsBatch(refractiveIndexInner=refractiveIndexInner,
+                                         refractiveIndexOuter=refractiveIndexOuter,
+                                         incidenceHeights=heights)
+
+    if sampling == 'adaptive':
+        # bins as wide as for numberOfPoints uniformly spread over the range of eta0
+        eta0sCoarse = raindropCalculationsFromHeights(linspace(-1, 1, numberOfPoints)).eta0Internal
+        # the rays at the adaptive heights come from the refinement, they aren't calculated again
+        heights, rays = adaptiveHeights(raindropCalculationsFromHeights=raindropCalculationsFromHeights,
+                                        tolerance=adaptiveTolerance,
+                                        resolution=(max(eta0sCoarse) - min(eta0sCoarse)) / numberOfPoints,
+                                        powerIncidentDensity=incidentPowerProfile.powerDensityArray)
+        raindropCalculations = None
+        # the histogram redistribution works on the adaptive heights directly
+        heightsSupersampled = heights
+        eta0sInternalSupersampled = rays.eta0Internal
+        powersTEheightsSupersampled = rays.powersTE
+        powersTMheightsSupersampled = rays.powersTM
+    else:
+        # the average of every chunk of supersampling heights
+        heightsSupersampled = linspace(-1, 1, numberOfPoints*supersampling)
+        heights = heightsSupersampled.reshape(numberOfPoints, supersampling).mean(axis=1)
+        # powers and eta0 dependent on incidence height
+        raindropCalculations = raindropCalculationsFromHeights(heights)
+        rays = RayBundle.fromRaindropCalculations(raindropCalculations=raindropCalculations)
+        if (redistribution == 'histogram') or (densityMode == 'numeric'):
+            raindropCalculationsSupersampled = raindropCalculationsFromHeights(heightsSupersampled)
+            eta0sInternalSupersampled = raindropCalculationsSupersampled.eta0Internal
+        if redistribution == 'histogram':
+            powersTEheightsSupersampled = raindropCalculationsSupersampled.transmittedPowerTransversalElectric
+            powersTMheightsSupersampled = raindropCalculationsSupersampled.transmittedPowerTransversalMagnetic
+
+    if (redistribution == 'histogram') or (densityMode == 'numeric'):
+        powerIncidenceDensityHeight = incidentPowerProfile.powerDensityArray(heightsSupersampled)
+    eta0sInternal = rays.eta0Internal
+    powersTEheightsInternal = rays.powersTE
+    powersTMheightsInternal = rays.powersTM
+
+    if redistribution == 'surjective':
+        # scale power from dH to deta
+        if densityMode == 'numeric':
+            powerIncidenceDensityEtaInternal = powerIncidenceDensityEtaNumeric(heightsSupersampled=heightsSupersampled,
+                                                                               eta0sInternalSupersampled=eta0sInternalSupersampled,
+                                                                               powerIncidenceDensityHeight=powerIncidenceDensityHeight,
+                                                                               numberOfPoints=numberOfPoints,
+                                                                               supersampling=supersampling)
+        else:
+            if raindropCalculations is None:
+                # adaptive heights - only for deta0InternaldH, which just depends on the heights
+                raindropCalculations = raindropCalculationsFromHeights(heights)
+            powerIncidenceDensityEtaInternal = powerIncidenceDensityEtaAnalytic(
+                raindropCalculations=raindropCalculations,
+                powerIncidenceDensityHeight=incidentPowerProfile.powerDensityArray(heights))
+
+    if redistribution == 'histogram':
+        # send the power of every supersampled height segment forward into the exit angle bins
+        eta0sExcidenceRadians, (powerExcidenceDensityEta0sInternalTE,
+                                powerExcidenceDensityEta0sInternalTM,
+                                powerExcidenceDensityEta0sInternalTETM) = \
+            redistributePowerDensity(heights=heightsSupersampled,
+                                     angles=eta0sInternalSupersampled,
+                                     powerDensitiesHeight=(powerIncidenceDensityHeight * powersTEheightsSupersampled,
+                                                           powerIncidenceDensityHeight * powersTMheightsSupersampled,
+                                                           powerIncidenceDensityHeight * (powersTEheightsSupersampled + powersTMheightsSupersampled) / 2.),
+                                     numberOfBins=numberOfPoints)
+    elif redistribution == 'surjective':
+        # combine height->eta0 and power-transmittance
+        powerExcidenceDensityHeightsInternalTE = powerIncidenceDensityEtaInternal * powersTEheightsInternal
+        powerExcidenceDensityHeightsInternalTM = powerIncidenceDensityEtaInternal * powersTMheightsInternal
+
+        eta0sExcidenceRadians, (powerExcidenceDensityEta0sInternalTE, powerExcidenceDensityEta0sInternalTM) = \
+            transformSurjectiveRelation(
+                oldXs=heights,
+                newXsOldXs=eta0sInternal,
+                oldYsOldXsList=(powerExcidenceDensityHeightsInternalTE, powerExcidenceDensityHeightsInternalTM),
+                numberOfPoints=numberOfPoints,
+                newXValidityCheck=lambda x: (-1. <= x <= 1.))
+
+        # assume even mix of TE and TM polrization [non-polarized light]
+        powerExcidenceDensityEta0sInternalTETM = tuple((tmp0 + tmp1) / 2. for tmp0, tmp1 in zip(powerExcidenceDensityEta0sInternalTE, powerExcidenceDensityEta0sInternalTM))
+    else:
+        raise ValueError('Unknown redistribution [{redistribution}].'.format(redistribution=redistribution))
+
+    return WavelengthResult(wavelength=wavelength,
+                            refractiveIndexInner=refractiveIndexInner,
+                            refractiveIndexOuter=refractiveIndexOuter,
+                            rays=rays,
+                            eta0sExcidence=eta0sExcidenceRadians,
+                            powerExcidenceDensityTE=powerExcidenceDensityEta0sInternalTE,
+                            powerExcidenceDensityTM=powerExcidenceDensityEta0sInternalTM,
+                            powerExcidenceDensityTETM=powerExcidenceDensityEta0sInternalTETM)
+
+
+def calculationParameters(wavelength, numberOfPoints, supersampling, redistribution, densityMode, sampling,
+                          incidentPowerProfile):
+    '''Everything a result of calculateWavelength depends on apart from the code, as JSON serializable values
+        [e.g. for the key of a ResultCache].'''
+    if incidentPowerProfile is None:
+        incidentPowerProfile = UniformIncidentPowerProfile()
+    refractiveIndexModel = RefractiveIndexWater()
+    return {'refractiveIndexModel': type(refractiveIndexModel).__name__,
+            'sellmeierCoefficientPairs': refractiveIndexModel.sellmeierCoefficientPairs,
+            'wavelengthMeters': float(wavelength.meters),
+            'numberOfPoints': numberOfPoints,
+            'supersampling': supersampling,
+            'redistribution': redistribution,
+            'densityMode': densityMode,
+            'sampling': sampling,
+            'incidentPowerProfile': (type(incidentPowerProfile).__name__,
+                                     arrayFingerprint(incidentPowerProfile.heights),
+                                     arrayFingerprint(incidentPowerProfile.powerDensities))}
+
+def _mapBounded(executor, function, arguments, numberOfPending):
+    # as executor.map - in the order of the arguments, regardless of which worker finishes first - but with at most
+    # numberOfPending calls submitted ahead of the consumer, so that results don't pile up if it is slower
+    arguments = iter(arguments)
+    pending = deque(executor.submit(function, argument) for argument in islice(arguments, numberOfPending))
+    while pending:
+        result = pending.popleft().result()
+        for argument in islice(arguments, 1):
+            pending.append(executor.submit(function, argument))
+        yield result
+    return
+
+def iterateWavelengths(wavelengths, numberOfPoints, supersampling, redistribution='histogram', densityMode='numeric',
+                       sampling='uniform', numberOfWorkers=1, incidentPowerProfile=None, cache=None):
+    '''Results of all wavelengths, yielded in the order of the wavelengths as soon as each is available. With more
+        than one worker the wavelengths are distributed over a process pool, otherwise they are calculated serially.
+        The pool calculates at most two wavelengths per worker ahead of the consumer, and closing the generator early
+        cancels the rest.
+
+        With a ResultCache, only the wavelengths missing from it are calculated and then added to it.'''
+    worker = partial(calculateWavelength, numberOfPoints=numberOfPoints, supersampling=supersampling,
+                     redistribution=redistribution, densityMode=densityMode, sampling=sampling,
+                     incidentPowerProfile=incidentPowerProfile)
+    keys = [None] * len(wavelengths)
+    if cache is not None:
+        for index, wavelength in enumerate(wavelengths):
+            keys[index] = cache.key(calculationParameters(wavelength=wavelength, numberOfPoints=numberOfPoints,
+                                                          supersampling=supersampling, redistribution=redistribution,
+                                                          densityMode=densityMode, sampling=sampling,
+                                                          incidentPowerProfile=incidentPowerProfile))
+    missing = tuple(index for index, key in enumerate(keys) if (key is None) or not cache.contains(key))
+
+    if (numberOfWorkers is not None and numberOfWorkers <= 1) or (len(missing) <= 1):
+        calculated = (worker(wavelengths[index]) for index in missing)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=numberOfWorkers)
+        calculated = _mapBounded(executor=executor, function=worker,
+                                 arguments=(wavelengths[index] for index in missing),
+                                 numberOfPending=2 * (cpu_count() if numberOfWorkers is None else numberOfWorkers))
+    missing = set(missing)
+    try:
+        for index, key in enumerate(keys):
+            arrays = None if index in missing else cache.load(key)
+            if arrays is not None:
+                yield WavelengthResult.fromArrays(arrays)
+                continue
+            # an entry may also have turned out corrupt or been evicted meanwhile
+            result = next(calculated) if index in missing else worker(wavelengths[index])
+            if cache is not None:
+                cache.store(key, result.toArrays())
+            yield result
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    return
+
+def sweepWavelengths(wavelengths, numberOfPoints, supersampling, redistribution='histogram', densityMode='numeric',
+                     sampling='uniform', numberOfWorkers=1, incidentPowerProfile=None, cache=None):
+    '''All results of iterateWavelengths at once, in the order of the wavelengths.'''
+    return tuple(iterateWavelengths(wavelengths=wavelengths, numberOfPoints=numberOfPoints, supersampling=supersampling,
+                                    redistribution=redistribution, densityMode=densityMode, sampling=sampling,
+                                    numberOfWorkers=numberOfWorkers, incidentPowerProfile=incidentPowerProfile,
+                                    cache=cache))
+
+def compareDensityModes(wavelength, numberOfPoints, supersampling, refractiveIndexOuter=1., incidentPowerProfile=None):
+    '''Relative deviation of the analytic from the numeric power density per internal angle at the chunk averaged
+        heights [NaN where either is not finite]. The numeric chunk sums the power of supersampling heights but only
+        covers the angle spread of supersampling - 1 height steps, so it is expected to be larger by the factor
+        supersampling / (supersampling - 1) - this factor is removed before comparing.'''
+    if incidentPowerProfile is None:
+        incidentPowerProfile = UniformIncidentPowerProfile()
+    refractiveIndexInner = RefractiveIndexWater().refractiveIndex(wavelength=wavelength)
+    heightsSupersampled = linspace(-1, 1, numberOfPoints*supersampling)
+    heights = heightsSupersampled.reshape(numberOfPoints, supersampling).mean(axis=1)
+    raindropCalculationsSupersampled = RaindropCalculationsBatch(refractiveIndexInner=refractiveIndexInner,
+                                                                 refractiveIndexOuter=refractiveIndexOuter,
+                                                                 incidenceHeights=heightsSupersampled)
+    raindropCalculations = RaindropCalculationsBatch(refractiveIndexInner=refractiveIndexInner,
+                                                     refractiveIndexOuter=refractiveIndexOuter,
+                                                     incidenceHeights=heights)
+    numeric = powerIncidenceDensityEtaNumeric(heightsSupersampled=heightsSupersampled,
+                                              eta0sInternalSupersampled=raindropCalculationsSupersampled.eta0Internal,
+                                              powerIncidenceDensityHeight=incidentPowerProfile.powerDensityArray(heightsSupersampled),
+                                              numberOfPoints=numberOfPoints,
+                                              supersampling=supersampling)
+    analytic = powerIncidenceDensityEtaAnalytic(raindropCalculations=raindropCalculations,
+                                                powerIncidenceDensityHeight=incidentPowerProfile.powerDensityArray(heights))
+    expected = numeric * (supersampling - 1) / supersampling
+    with errstate(divide='ignore', invalid='ignore'):
+        deviation = where(isfinite(expected) & isfinite(analytic), analytic / expected - 1., nan)
+    return heights, deviation
+
+def collectExtrema(results):
+    '''Extrema of all results, one list per key in the order of the results.'''
+    eta0sExtrema = {key: list() for key in WavelengthResult.ExtremaKeys}
+    for result in results:
+        for key, extremum in result.extrema.items():
+            eta0sExtrema[key].append(extremum)
+    return eta0sExtrema
+
+
+
+if __name__ == '__main__':
+    from time import perf_counter
+    from numpy import nanmax, nanmedian
+    wavelength = Length(nanometers=380)
+    for numberOfPoints in (201, 1001, 5001):
+        heights, deviation = compareDensityModes(wavelength=wavelength, numberOfPoints=numberOfPoints, supersampling=5)
+        # the caustic [deta0/dh = 0] and the rims [deta0/dh -> inf] are resolved differently by construction
+        regular = abs(heights) < .8
+        print('{points} points: analytic / numeric deviation median {median:.2e}, max [|h| < .8] {maximum:.2e}'.format(
+            points=numberOfPoints, median=nanmedian(abs(deviation)), maximum=nanmax(abs(deviation[regular]))))
+    for densityMode in ('numeric', 'analytic'):
+        start = perf_counter()
+        calculateWavelength(wavelength=wavelength, numberOfPoints=1001, supersampling=5,
+                            redistribution='surjective', densityMode=densityMode)
+        print('{densityMode}: {seconds:.3f}s'.format(densityMode=densityMode, seconds=perf_counter() - start))
+    exit(0)